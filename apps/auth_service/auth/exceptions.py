@@ -13,3 +13,14 @@ class UserAuthorizationError(HTTPException):
         return (
             f'Ошибка авторизации для {self.username}. Неверно указан логин или пароль'
         )
+
+
+class PasswordHashingBusyError(HTTPException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    def __init__(self):
+        self.headers = {'Retry-After': '1'}
+
+    @property
+    def detail(self) -> str:
+        return 'Сервис авторизации перегружен, повторите попытку позже'
@@ -11,8 +11,8 @@ from apps.core.repository_base import BaseRepository
 class UserRepository(BaseRepository[User, UserCreateSchema, UserUpdateSchema]):
     pk_name = 'uuid'
 
-    def __init__(self, session: AsyncSession):
-        super().__init__(session)
+    def __init__(self, session: AsyncSession, read_session: Optional[AsyncSession] = None):
+        super().__init__(session, read_session)
         self.model = User
 
     async def get_by_username(self, username: str) -> Optional[User]:
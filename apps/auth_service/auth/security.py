@@ -1,3 +1,6 @@
+import hashlib
+import time
+
 from authlib.jose import jwt
 from authlib.jose.errors import BadSignatureError, ExpiredTokenError
 from fastapi import HTTPException
@@ -7,6 +10,7 @@ from fastapi_jwt import JwtAccessBearer, JwtRefreshBearer
 from starlette.websockets import WebSocket
 
 from apps.auth_service.auth.exceptions import UserAuthorizationError
+from apps.core.cache import TTLCache
 from apps.core.config import settings
 from apps.core.schema_base import AuthenticatedUser
 
@@ -16,13 +20,22 @@ refresh_security = JwtRefreshBearer(secret_key=settings.JWT_SECRET_KEY, auto_err
 
 basic_security = HTTPBasic()
 
+# sha256(token) -> AuthenticatedUser для уже проверенных токенов
+token_cache: TTLCache[AuthenticatedUser] = TTLCache(
+    max_size=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL
+)
+
 
 async def get_data_from_token(token: str) -> AuthenticatedUser:
     if token:
+        cache_key = hashlib.sha256(token.encode('utf-8')).digest()
+        user = token_cache.get(cache_key)
+        if user is not None:
+            return user
         try:
             payload = jwt.decode(token, settings.JWT_SECRET_KEY)
             payload.validate()
-            return AuthenticatedUser(**payload.get('subject', {}))
+            user = AuthenticatedUser(**payload.get('subject', {}))
         except ExpiredTokenError:
             raise HTTPException(
                 status_code=401, detail='Срок действия токена закончился'
@@ -31,6 +44,13 @@ async def get_data_from_token(token: str) -> AuthenticatedUser:
             raise HTTPException(
                 status_code=401, detail='Invalid token or expired token'
             )
+        expires_at = payload.get('exp')
+        token_cache.set(
+            cache_key,
+            user,
+            ttl=expires_at - time.time() if expires_at is not None else None,
+        )
+        return user
     raise HTTPException(status_code=401, detail='Not authenticated')
 
 
@@ -1,5 +1,4 @@
 from uuid import uuid4
-from passlib.context import CryptContext
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -7,9 +6,7 @@ from apps.auth_service.auth.exceptions import UserAuthorizationError
 from apps.auth_service.auth.models import User
 from apps.auth_service.auth.repository import UserRepository
 from apps.auth_service.auth.schemas import UserCreateRequestSchema, UserCreateSchema
-
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from apps.auth_service.auth.services.password_service import password_service
 
 
 class AuthService:
@@ -21,7 +18,7 @@ class AuthService:
         await self._user_repository.create(
             UserCreateSchema(**{
                 **user_base_schema.model_dump(),
-                "password_hash": self._hash_password(user_base_schema.password),
+                "password_hash": await self._hash_password(user_base_schema.password),
                 "uuid": str(uuid4())
             })
         )
@@ -29,8 +26,8 @@ class AuthService:
         await self._session.commit()
 
     @staticmethod
-    def _hash_password(password: str) -> str:
-        return pwd_context.hash(password)
+    async def _hash_password(password: str) -> str:
+        return await password_service.hash(password)
 
     async def authenticate_and_get_user_jwt(
             self, username: str, password: str
@@ -38,6 +35,15 @@ class AuthService:
         user = await self._user_repository.get_by_username(username)
         if not user:
             raise UserAuthorizationError(username)
-        if pwd_context.verify(password, user.password_hash):
-            return user
-        raise UserAuthorizationError(username)
+        is_valid, new_hash = await password_service.verify_and_update(
+            password, user.password_hash
+        )
+        if not is_valid:
+            raise UserAuthorizationError(username)
+        if new_hash:
+            # Стоимость bcrypt изменилась - перехэшируем пароль при входе
+            user.password_hash = new_hash
+            await self._session.flush()
+            await self._session.commit()
+            await self._session.refresh(user)
+        return user
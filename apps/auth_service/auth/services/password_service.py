@@ -0,0 +1,59 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from apps.auth_service.auth.exceptions import PasswordHashingBusyError
+from apps.core.config import settings
+
+# При смене BCRYPT_ROUNDS старые хэши помечаются как требующие обновления
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+
+class PasswordService:
+    """
+    Хэширование и проверка паролей вне event loop.
+
+    bcrypt выполняется в ограниченном пуле потоков (bcrypt отпускает GIL).
+    Одновременно в пул попадает не больше `max_workers` задач, остальные ждут
+    слот не дольше `queue_timeout` секунд и затем быстро получают 503.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.PASSWORD_HASH_WORKERS,
+        queue_timeout: float = settings.PASSWORD_HASH_QUEUE_TIMEOUT,
+    ):
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='bcrypt'
+        )
+        self._slots = asyncio.Semaphore(max_workers)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(
+        self, password: str, password_hash: str
+    ) -> tuple[bool, Optional[str]]:
+        """Проверяет пароль; вторым элементом возвращает новый хэш, если текущий устарел."""
+
+        return await self._run(pwd_context.verify_and_update, password, password_hash)
+
+    async def _run(self, func, *args):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise PasswordHashingBusyError()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, func, *args
+            )
+        finally:
+            self._slots.release()
+
+
+password_service = PasswordService()
@@ -3,7 +3,8 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from apps.auth_service.cunsumer import KafkaConsumer
+from apps.core.config import settings
+from apps.core.kafka import KafkaConsumer
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +24,15 @@ async def handle_message(message: dict, topic: str, partition: int, offset: int)
     # Имитация обработки
     await process_message(message)
 
+async def handle_batch(messages: list[dict], topic: str, partition: int, offsets: list[int]):
+    logger.info(
+        f"Received {len(messages)} messages from {topic}[{partition}] "
+        f"offsets {offsets[0]}-{offsets[-1]}"
+    )
+    # Сообщения пачки пока обрабатываются по одному; коммит оффсетов - один на пачку
+    for message in messages:
+        await process_message(message)
+
 async def process_message(message: dict):
     # Ваша логика обработки
     logger.info(f"Processing message: {message.get('message_id')}")
@@ -33,10 +43,16 @@ async def process_message(message: dict):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await kafka_consumer.start(
-        topics=["default-topic", "another-topic"],
-        message_handler=handle_message
-    )
+    if settings.KAFKA_BATCH_MODE:
+        await kafka_consumer.start(
+            topics=["default-topic", "another-topic"],
+            batch_handler=handle_batch
+        )
+    else:
+        await kafka_consumer.start(
+            topics=["default-topic", "another-topic"],
+            message_handler=handle_message
+        )
     logger.info("Kafka consumer started")
     yield
     # Shutdown
@@ -8,6 +8,7 @@ from apps.auth_service.auth.models import User
 from apps.auth_service.auth.router import router as auth_router
 from apps.auth_service.lifespan import lifespan
 from apps.core.database import engine
+from apps.core.metrics import PrometheusMiddleware, metrics_router
 
 app = FastAPI(
     docs_url="/api/v1/docs",
@@ -27,7 +28,10 @@ app.add_middleware(
     # max_age=3600 # seconds until the session expires
 )
 
+app.add_middleware(PrometheusMiddleware)
+
 app.include_router(auth_router)
+app.include_router(metrics_router)
 
 # Create admin
 admin = Admin(engine, auth_provider=UsernameAndPasswordProvider(), title="Example: SQLAlchemy")
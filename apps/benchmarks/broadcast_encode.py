@@ -0,0 +1,105 @@
+"""
+Стоимость сериализации при рассылке сообщения в чат.
+
+Замеряет настоящий `ConnectionManager.broadcast` на заглушках соединений
+(фреймы остаются в их очередях) и сравнивает его с прежней схемой, где
+сообщение сериализовалось для каждого получателя отдельно. Обе стороны
+используют один и тот же кодировщик `ConnectionManager.encode`, поэтому
+разница - только от сериализации один раз на рассылку. Время приводится
+в пересчёте на одного получателя. Пример:
+
+    python -m apps.benchmarks.broadcast_encode --members 10 100 1000
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Optional
+
+from apps.core.managers.connection_manager import (
+    Connection,
+    ConnectionManager,
+    FrameFormat,
+)
+
+CHAT_ID = 42
+MESSAGE = {
+    'type': 'message',
+    'chat_id': CHAT_ID,
+    'user_uid': '00000000-0000-0000-0000-000000000000',
+    'username': 'operator',
+    'content': 'Добрый день! Подскажите, пожалуйста, номер вашего договора. ' * 3,
+    'created_at': '2026-10-18T10:20:41.118204+00:00',
+}
+
+
+class PerRecipientManager(ConnectionManager):
+    """Прежняя рассылка: сообщение сериализуется для каждого получателя."""
+
+    async def broadcast(
+        self,
+        chat_id: int,
+        message: Any,
+        exclude_user: str = None,
+        exclude: Optional[Connection] = None,
+    ):
+        for user_id, sockets in list(self.active_connections.get(chat_id, {}).items()):
+            if exclude_user and user_id == exclude_user:
+                continue
+            for connection in list(sockets):
+                if connection is not exclude:
+                    self._enqueue(connection, self.encode(message))
+
+
+def make_chat(manager: ConnectionManager, members: int) -> list[Connection]:
+    """Регистрирует `members` соединений без сокетов и без задач-писателей."""
+
+    connections = []
+    for index in range(members):
+        user_id = f'user-{index}'
+        connection = Connection(CHAT_ID, user_id, websocket=None, queue_size=1)
+        manager.active_connections.setdefault(CHAT_ID, {})[user_id] = {connection}
+        manager.user_connections[user_id] = {connection}
+        connections.append(connection)
+    return connections
+
+
+async def measure(manager: ConnectionManager, members: int, number: int) -> float:
+    """Среднее время рассылки на одного получателя, в микросекундах."""
+
+    connections = make_chat(manager, members)
+    elapsed = 0.0
+    for _ in range(number):
+        start = time.perf_counter()
+        await manager.broadcast(CHAT_ID, MESSAGE)
+        elapsed += time.perf_counter() - start
+        # Очереди освобождаем вне замера
+        for connection in connections:
+            connection.queue.get_nowait()
+    return elapsed / number / members * 1e6
+
+
+async def main(members_list: list[int], number: int):
+    print(
+        f"{'members':>8} {'format':>7} {'per-recipient encode, us':>25} "
+        f"{'encode once, us':>16} {'speed-up':>9}"
+    )
+    for members in members_list:
+        for frame_format in FrameFormat:
+            before = await measure(
+                PerRecipientManager(frame_format=frame_format), members, number
+            )
+            after = await measure(
+                ConnectionManager(frame_format=frame_format), members, number
+            )
+            print(
+                f'{members:>8} {frame_format.value:>7} {before:>25.3f} '
+                f'{after:>16.3f} {before / after:>8.1f}x'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Стоимость сериализации при рассылке')
+    parser.add_argument('--members', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--number', type=int, default=200, help='Повторов на замер')
+    args = parser.parse_args()
+    asyncio.run(main(args.members, args.number))
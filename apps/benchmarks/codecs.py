@@ -0,0 +1,71 @@
+"""
+Сравнение кодеков сообщений Kafka: время кодирования и декодирования и размер.
+
+Замеряются все установленные кодеки из `CODECS` вместе с конвертом, то есть
+ровно то, что пишет продюсер и читает консьюмер. Первая строка - прежняя
+схема без конверта (`json.dumps(...).encode()` и `json.loads`). Пример:
+
+    python -m apps.benchmarks.codecs --number 20000
+"""
+import argparse
+import json
+import timeit
+from functools import partial
+
+from apps.core.codecs import CODECS, decode_envelope, encode_envelope
+
+SAMPLES = {
+    'chat message': {
+        'node_id': '3f2b9c1e8a7d4e6f9b0c1d2e3f4a5b6c',
+        'chat_id': 42,
+        'message': 'Сообщение: Добрый день! Подскажите номер вашего договора.',
+        'exclude_user': '00000000-0000-0000-0000-000000000000',
+    },
+    'auth event': {
+        'message_id': 'b6c7d8e9-f0a1-4b2c-8d3e-4f5a6b7c8d9e',
+        'source': 'chat_service',
+        'data': {
+            'user_uid': '00000000-0000-0000-0000-000000000000',
+            'roles': ['operator', 'supervisor'],
+            'attempts': [1, 2, 3, 5, 8, 13],
+            'score': 0.9375,
+            'active': True,
+        },
+    },
+}
+
+
+def plain_json_encode(value) -> bytes:
+    # Сериализатор продюсера до появления кодеков
+    return json.dumps(value).encode('utf-8')
+
+
+def plain_json_decode(data: bytes):
+    # Десериализатор консьюмера до появления кодеков
+    return json.loads(data.decode('utf-8'))
+
+
+def main(number: int):
+    print(f"{'sample':<14} {'codec':<14} {'bytes':>6} {'encode, us':>11} {'decode, us':>11}")
+    for sample_name, value in SAMPLES.items():
+        variants = [('json (before)', plain_json_encode, plain_json_decode)]
+        variants += [
+            (codec.name, partial(encode_envelope, codec=codec), decode_envelope)
+            for codec in CODECS.values()
+        ]
+        for name, encoder, decoder in variants:
+            data = encoder(value)
+            assert decoder(data) == value
+            encode = timeit.timeit(lambda: encoder(value), number=number)
+            decode = timeit.timeit(lambda: decoder(data), number=number)
+            print(
+                f'{sample_name:<14} {name:<14} {len(data):>6} '
+                f'{encode / number * 1e6:>11.2f} {decode / number * 1e6:>11.2f}'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Сравнение кодеков сообщений Kafka')
+    parser.add_argument('--number', type=int, default=100_000, help='Повторов на замер')
+    args = parser.parse_args()
+    main(args.number)
@@ -0,0 +1,70 @@
+"""
+Сравнение загрузки сообщений через ORM (`bulk_create`) и COPY (`copy_records`).
+
+Каждый замер выполняется в отдельной транзакции, которая затем откатывается,
+поэтому скрипт можно запускать на рабочей схеме. Пример:
+
+    python -m apps.benchmarks.copy_vs_orm \\
+        --dsn postgresql+asyncpg://postgres:1@localhost:5432/callcentre_db \\
+        --sizes 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from apps.chat_service.chat.models import Chat
+from apps.chat_service.message.repository import MessageRepository
+from apps.chat_service.message.schemas import MessageCreateSchema
+
+
+def make_messages(count: int, chat_id: int) -> list[MessageCreateSchema]:
+    return [
+        MessageCreateSchema(
+            content=f'Расшифровка звонка, реплика {i}',
+            user_uid='00000000-0000-0000-0000-000000000000',
+            username='benchmark',
+            email='benchmark@example.com',
+            chat_id=chat_id,
+        )
+        for i in range(count)
+    ]
+
+
+async def measure(session_factory, count: int, method: str) -> float:
+    async with session_factory() as session:
+        chat = Chat(name='benchmark')
+        session.add(chat)
+        await session.flush()
+        messages = make_messages(count, chat.id)
+        repository = MessageRepository(session)
+        start = time.perf_counter()
+        if method == 'orm':
+            await repository.bulk_create(messages)
+        else:
+            await repository.copy_records(messages)
+        elapsed = time.perf_counter() - start
+        await session.rollback()
+    return elapsed
+
+
+async def main(dsn: str, sizes: list[int]):
+    engine = create_async_engine(dsn)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False)
+    print(f"{'rows':>10} {'orm, s':>10} {'copy, s':>10} {'speedup':>8}")
+    try:
+        for count in sizes:
+            orm = await measure(session_factory, count, 'orm')
+            copy = await measure(session_factory, count, 'copy')
+            print(f'{count:>10} {orm:>10.2f} {copy:>10.2f} {orm / copy:>7.1f}x')
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--dsn', required=True, help='DSN вида postgresql+asyncpg://...')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    asyncio.run(main(args.dsn, args.sizes))
@@ -0,0 +1,152 @@
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Optional, Protocol
+from uuid import uuid4
+
+from apps.core.config import settings
+from apps.core.kafka import KafkaConsumer, KafkaProducer
+from apps.core.managers.connection_manager import (
+    Connection,
+    ConnectionManager,
+    connection_manager,
+)
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[dict, str, int, int], Awaitable[None]]
+
+
+class BackplaneTransport(Protocol):
+    async def start(self, topic: str, handler: MessageHandler): ...
+
+    async def stop(self): ...
+
+    async def publish(self, topic: str, key: Any, message: dict): ...
+
+
+class KafkaTransport:
+    """Транспорт поверх Kafka: каждый узел читает все партиции топика без группы."""
+
+    def __init__(self, producer: KafkaProducer, consumer: Optional[KafkaConsumer] = None):
+        self._producer = producer
+        self._consumer = consumer or KafkaConsumer(
+            group_id=None, auto_offset_reset='latest'
+        )
+
+    async def start(self, topic: str, handler: MessageHandler):
+        await self._consumer.start(topics=[topic], message_handler=handler)
+
+    async def stop(self):
+        await self._consumer.stop()
+
+    async def publish(self, topic: str, key: Any, message: dict):
+        await self._producer.send_message(topic, message, key=key)
+
+
+class InMemoryBroker:
+    """
+    Брокер-заглушка в памяти процесса вместо Kafka.
+
+    Позволяет поднять несколько «узлов» в одном процессе (например, в тестах)
+    и проверить доставку сообщений между ними без настоящего брокера.
+    """
+
+    def __init__(self):
+        self._subscribers: dict[str, list[MessageHandler]] = defaultdict(list)
+        self._offsets: dict[str, int] = defaultdict(int)
+
+    def subscribe(self, topic: str, handler: MessageHandler):
+        self._subscribers[topic].append(handler)
+
+    def unsubscribe(self, topic: str, handler: MessageHandler):
+        if handler in self._subscribers[topic]:
+            self._subscribers[topic].remove(handler)
+
+    async def publish(self, topic: str, key: Any, message: dict):
+        offset = self._offsets[topic]
+        self._offsets[topic] += 1
+        for handler in list(self._subscribers[topic]):
+            await handler(message, topic, 0, offset)
+
+
+class InMemoryTransport:
+    def __init__(self, broker: InMemoryBroker):
+        self._broker = broker
+        self._subscription: Optional[tuple[str, MessageHandler]] = None
+
+    async def start(self, topic: str, handler: MessageHandler):
+        self._broker.subscribe(topic, handler)
+        self._subscription = (topic, handler)
+
+    async def stop(self):
+        if self._subscription:
+            self._broker.unsubscribe(*self._subscription)
+            self._subscription = None
+
+    async def publish(self, topic: str, key: Any, message: dict):
+        await self._broker.publish(topic, key, message)
+
+
+class BroadcastBackplane:
+    """
+    Рассылка сообщений чата между воркерами и узлами.
+
+    Сообщение сразу доставляется локальным подписчикам и публикуется в топик
+    с ключом `chat_id`. Остальные узлы доставляют его только в те чаты,
+    у которых на этом узле есть подключения; своё же эхо узел пропускает.
+    """
+
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        topic: str = settings.BROADCAST_TOPIC,
+    ):
+        self.manager = manager
+        self.topic = topic
+        self.node_id = uuid4().hex
+        self._transport: Optional[BackplaneTransport] = None
+
+    async def start(self, transport: BackplaneTransport):
+        self._transport = transport
+        await transport.start(self.topic, self._handle)
+
+    async def stop(self):
+        if self._transport:
+            await self._transport.stop()
+            self._transport = None
+
+    async def publish(
+        self,
+        chat_id: int,
+        message: Any,
+        exclude_user: str = None,
+        exclude: Optional[Connection] = None,
+    ):
+        await self.manager.broadcast(
+            chat_id, message, exclude_user=exclude_user, exclude=exclude
+        )
+        if self._transport is None:
+            return
+        await self._transport.publish(
+            self.topic,
+            chat_id,
+            {
+                'node_id': self.node_id,
+                'chat_id': chat_id,
+                'message': message,
+                'exclude_user': exclude_user,
+            },
+        )
+
+    async def _handle(self, value: dict, topic: str, partition: int, offset: int):
+        if value.get('node_id') == self.node_id:
+            return
+        chat_id = value.get('chat_id')
+        if chat_id not in self.manager.active_connections:
+            return
+        await self.manager.broadcast(
+            chat_id, value.get('message'), exclude_user=value.get('exclude_user')
+        )
+
+
+broadcast_backplane = BroadcastBackplane(connection_manager)
@@ -9,4 +9,6 @@ class Chat(BaseDBModel):
     __tablename__ = "chat_chat"
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str]
-    messages: Mapped[Optional["Message"]] = relationship("Message", back_populates="chat")
\ No newline at end of file
+    messages: Mapped[Optional["Message"]] = relationship(
+        "Message", back_populates="chat", passive_deletes=True
+    )
\ No newline at end of file
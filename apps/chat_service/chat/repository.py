@@ -1,3 +1,5 @@
+from typing import Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from apps.chat_service.chat.models import Chat
@@ -6,6 +8,6 @@ from apps.core.repository_base import BaseRepository
 
 
 class ChatRepository(BaseRepository[Chat, ChatCreateSchema, ChatUpdateSchema]):
-    def __init__(self, session: AsyncSession):
-        super().__init__(session)
+    def __init__(self, session: AsyncSession, read_session: Optional[AsyncSession] = None):
+        super().__init__(session, read_session)
         self.model = Chat
@@ -4,8 +4,12 @@ from fastapi import APIRouter, status, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from apps.auth_service.auth.security import get_data_from_access_token
-from apps.chat_service.chat.repository import ChatRepository
-from apps.chat_service.chat.schemas import ChatDetailSchema, ChatCreateSchema
+from apps.chat_service.chat.schemas import (
+    ChatCreateSchema,
+    ChatDetailSchema,
+    ChatUpdateSchema,
+)
+from apps.chat_service.chat.services.chat_cache import chat_cache
 from apps.chat_service.chat.services.chat_service import ChatService
 from apps.core.database import get_session
 from apps.core.schema_base import AuthenticatedUser
@@ -32,6 +36,52 @@ async def create_chat(
 ):
     service = ChatService(session)
     new_chat = await service.create_chat(chat_schema)
-    chat_id = new_chat.id
+    chat = ChatDetailSchema.model_validate(new_chat)
+    await session.commit()
+    return chat_cache.set(chat)
+
+
+@router.get(
+    '/chat/{chat_id}',
+    summary='Получение чата',
+    response_model=ChatDetailSchema,
+)
+async def get_chat(
+    chat_id: int,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AuthenticatedUser, Depends(get_data_from_access_token)],
+):
+    return await chat_cache.get(chat_id, session)
+
+
+@router.put(
+    '/chat/{chat_id}',
+    summary='Изменение чата',
+    response_model=ChatDetailSchema,
+)
+async def update_chat(
+    chat_id: int,
+    chat_schema: ChatUpdateSchema,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AuthenticatedUser, Depends(get_data_from_access_token)],
+):
+    updated_chat = await ChatService(session).update_chat(chat_id, chat_schema)
+    chat = ChatDetailSchema.model_validate(updated_chat)
+    await session.commit()
+    await chat_cache.invalidate(chat_id)
+    return chat_cache.set(chat)
+
+
+@router.delete(
+    '/chat/{chat_id}',
+    summary='Удаление чата',
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def delete_chat(
+    chat_id: int,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AuthenticatedUser, Depends(get_data_from_access_token)],
+):
+    await ChatService(session).delete_chat(chat_id)
     await session.commit()
-    return await ChatRepository(session).get_by_pk(chat_id)
+    await chat_cache.invalidate(chat_id)
@@ -1,6 +1,6 @@
 from typing import Annotated
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 
@@ -17,4 +17,6 @@ class ChatUpdateSchema(ChatBaseSchema):
 
 
 class ChatDetailSchema(ChatBaseSchema):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
@@ -0,0 +1,93 @@
+import logging
+from typing import Any, Optional
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.chat_service.backplane import BackplaneTransport
+from apps.chat_service.chat.repository import ChatRepository
+from apps.chat_service.chat.schemas import ChatDetailSchema
+from apps.core.cache import TTLCache
+from apps.core.config import settings
+from apps.core.database import AsyncSession as SessionFactory
+
+logger = logging.getLogger(__name__)
+
+
+class ChatCache:
+    """
+    Кэш метаданных чатов в памяти процесса.
+
+    Заполняется при чтении и при создании чата. При изменении или удалении
+    чата запись обновляется локально, а остальным узлам через транспорт
+    бэкплейна рассылается инвалидация; свою же инвалидацию узел пропускает.
+    Отсутствующие чаты не кэшируются, чтобы созданный на другом узле чат
+    был виден сразу.
+    """
+
+    def __init__(
+        self,
+        max_size: int = settings.CHAT_CACHE_SIZE,
+        ttl: float = settings.CHAT_CACHE_TTL,
+        topic: str = settings.CHAT_INVALIDATION_TOPIC,
+    ):
+        self.topic = topic
+        self.node_id = uuid4().hex
+        self._cache: TTLCache[ChatDetailSchema] = TTLCache(max_size, ttl)
+        self._transport: Optional[BackplaneTransport] = None
+
+    async def start(self, transport: BackplaneTransport):
+        self._transport = transport
+        await transport.start(self.topic, self._handle)
+
+    async def stop(self):
+        if self._transport:
+            await self._transport.stop()
+            self._transport = None
+
+    async def get(
+        self, chat_id: int, session: Optional[AsyncSession] = None
+    ) -> ChatDetailSchema:
+        """
+        Возвращает чат из кэша, при промахе читает его из основной БД.
+
+        Без `session` для чтения открывается отдельная сессия, только при промахе.
+        Если чата нет, выбрасывает `ObjectDoesntExist`.
+        """
+
+        chat = self._cache.get(chat_id)
+        if chat is not None:
+            return chat
+        if session is not None:
+            db_chat = await ChatRepository(session).get_by_pk(chat_id)
+            return self.set(db_chat)
+        async with SessionFactory() as own_session:
+            db_chat = await ChatRepository(own_session).get_by_pk(chat_id)
+            return self.set(db_chat)
+
+    def set(self, chat: Any) -> ChatDetailSchema:
+        chat = ChatDetailSchema.model_validate(chat)
+        self._cache.set(chat.id, chat)
+        return chat
+
+    async def invalidate(self, chat_id: int):
+        """Удаляет чат из кэша этого узла и рассылает инвалидацию остальным."""
+
+        self._cache.pop(chat_id)
+        if self._transport is None:
+            return
+        await self._transport.publish(
+            self.topic, chat_id, {'node_id': self.node_id, 'chat_id': chat_id}
+        )
+
+    async def _handle(self, value: dict, topic: str, partition: int, offset: int):
+        if value.get('node_id') == self.node_id:
+            return
+        self._cache.pop(value.get('chat_id'))
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return self._cache.stats
+
+
+chat_cache = ChatCache()
@@ -1,7 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from apps.chat_service.chat.repository import ChatRepository
-from apps.chat_service.chat.schemas import ChatCreateSchema
+from apps.chat_service.chat.schemas import ChatCreateSchema, ChatUpdateSchema
 
 
 class ChatService:
@@ -12,3 +12,9 @@ class ChatService:
     async def create_chat(self, chat: ChatCreateSchema):
         chat = await self._repository.create(chat)
         return chat
+
+    async def update_chat(self, chat_id: int, chat: ChatUpdateSchema):
+        return await self._repository.update(chat_id, chat)
+
+    async def delete_chat(self, chat_id: int):
+        await self._repository.delete(chat_id)
@@ -3,8 +3,20 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from pydantic import BaseModel
 
-from apps.chat_service.producer import KafkaProducer
+from apps.chat_service.backplane import (
+    InMemoryBroker,
+    InMemoryTransport,
+    KafkaTransport,
+    broadcast_backplane,
+)
+from apps.chat_service.chat.services.chat_cache import chat_cache
+from apps.chat_service.message.services.partition_maintainer import partition_maintainer
+from apps.chat_service.message.services.message_writer import (
+    message_indexer,
+    message_writer,
+)
 from apps.core.config import settings
+from apps.core.kafka import KafkaProducer
 from apps.core.services.elasticsearch_service import ElasticsearchService
 
 
@@ -20,6 +32,15 @@ async def init_elasticsearch_index():
     mappings = {
         "mappings": {
             "properties": {
+                "id": {
+                    "type": "long",
+                },
+                "chat_id": {
+                    "type": "integer",
+                },
+                "user_uid": {
+                    "type": "keyword",
+                },
                 "content": {
                     "type": "text",
                     "analyzer": "russian"
@@ -30,6 +51,9 @@ async def init_elasticsearch_index():
                 "email": {
                     "type": "text",
                 },
+                "created_at": {
+                    "type": "date",
+                },
             }
         }
     }
@@ -40,7 +64,22 @@ async def lifespan(app: FastAPI):
     await init_elasticsearch_index()
     await kafka_producer.start()
     print("Kafka producer started")
+    await message_indexer.start()
+    await message_writer.start()
+    if settings.BROADCAST_BACKPLANE == 'kafka':
+        await broadcast_backplane.start(KafkaTransport(kafka_producer))
+        await chat_cache.start(KafkaTransport(kafka_producer))
+    else:
+        broker = InMemoryBroker()
+        await broadcast_backplane.start(InMemoryTransport(broker))
+        await chat_cache.start(InMemoryTransport(broker))
+    await partition_maintainer.start()
     yield
+    await partition_maintainer.stop()
+    await chat_cache.stop()
+    await broadcast_backplane.stop()
+    await message_writer.stop()
+    await message_indexer.stop()
     await kafka_producer.stop()
     print("Kafka producer stopped")
 
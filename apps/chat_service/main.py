@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 
 from apps.chat_service.chat.router import router as chat_router
+from apps.chat_service.message import router as message_router  # noqa: F401
 from apps.chat_service.lifespan import lifespan
+from apps.core.metrics import PrometheusMiddleware, metrics_router
 
 app = FastAPI(
     lifespan=lifespan,
@@ -12,4 +14,7 @@ app = FastAPI(
     version="1.0.0",
 )
 
+app.add_middleware(PrometheusMiddleware)
+
 app.include_router(chat_router)
+app.include_router(metrics_router)
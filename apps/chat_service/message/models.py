@@ -1,6 +1,6 @@
 from typing import Optional
 
-from sqlalchemy import Text, String, Integer, ForeignKey
+from sqlalchemy import TIMESTAMP, Column, Text, String, Integer, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from apps.chat_service.chat.models import Chat
@@ -9,7 +9,17 @@ from apps.core.models import BaseDBModel
 
 class Message(BaseDBModel):
     __tablename__ = "chat_message"
+    __table_args__ = (
+        Index('ix_chat_message_chat_id_created_at_id', 'chat_id', 'created_at', 'id'),
+        Index('ix_chat_message_created_at_id', 'created_at', 'id'),
+        # Помесячные партиции по created_at, см. PartitionMaintainer
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # Ключ партиционирования обязан входить в первичный ключ
+    created_at = Column(
+        TIMESTAMP(timezone=True), server_default=func.now(), nullable=False, primary_key=True
+    )
     content: Mapped[Text] = mapped_column(type_=Text)
     user_uid: Mapped[int] = mapped_column( type_=String(36))
     username: Mapped[str] = mapped_column(type_=String(50))
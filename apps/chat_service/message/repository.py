@@ -1,3 +1,7 @@
+from datetime import datetime
+from typing import Optional, Sequence
+
+from sqlalchemy import tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from apps.chat_service.message.models import Message
@@ -6,6 +10,59 @@ from apps.core.repository_base import BaseRepository
 
 
 class MessageRepository(BaseRepository[Message, MessageCreateSchema, MessageUpdateSchema]):
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, read_session: Optional[AsyncSession] = None):
         self.model = Message
-        super().__init__(session)
+        super().__init__(session, read_session)
+
+    async def get_chat_page(
+        self,
+        chat_id: int,
+        limit: int,
+        before: Optional[tuple[datetime, int]] = None,
+        after: Optional[tuple[datetime, int]] = None,
+    ) -> Sequence[Message]:
+        """
+        Страница истории чата по ключу (chat_id, created_at, id).
+
+        Без курсора возвращает последние сообщения, с `before` - более старые,
+        с `after` - более новые. Порядок строк - от курсора, то есть по убыванию
+        для `before` и по возрастанию для `after`.
+        """
+
+        # Сравнение кортежей не отсекает партиции, поэтому рядом с ним
+        # всегда есть простое условие на created_at
+        position = tuple_(Message.created_at, Message.id)
+        stmt = self._base_query.where(Message.chat_id == chat_id)
+        if after is not None:
+            stmt = stmt.where(
+                Message.created_at >= after[0], position > tuple_(*after)
+            ).order_by(Message.created_at.asc(), Message.id.asc())
+        else:
+            if before is not None:
+                stmt = stmt.where(
+                    Message.created_at <= before[0], position < tuple_(*before)
+                )
+            stmt = stmt.order_by(Message.created_at.desc(), Message.id.desc())
+        result = await self.read_session.execute(stmt.limit(limit))
+        return result.scalars().all()
+
+    async def get_older_than(
+        self,
+        created_before: datetime,
+        limit: int,
+        after: Optional[tuple[datetime, int]] = None,
+    ) -> Sequence[Message]:
+        """
+        Сообщения с `created_at` < `created_before` по возрастанию (created_at, id).
+
+        `after` - позиция последней прочитанной строки для keyset-пагинации.
+        Читает из основной сессии, так как используется перед удалением строк.
+        """
+
+        position = tuple_(Message.created_at, Message.id)
+        stmt = self._base_query.where(Message.created_at < created_before)
+        if after is not None:
+            stmt = stmt.where(Message.created_at >= after[0], position > tuple_(*after))
+        stmt = stmt.order_by(Message.created_at.asc(), Message.id.asc()).limit(limit)
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
@@ -1,16 +1,43 @@
-import asyncio
-from typing import Annotated
+from datetime import datetime
+from typing import Annotated, Optional
 
-from fastapi import Depends
+from fastapi import Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.websockets import WebSocket, WebSocketDisconnect
 
-from apps.auth_service.auth.security import get_data_from_socket_access_token
+from apps.auth_service.auth.security import (
+    get_data_from_access_token,
+    get_data_from_socket_access_token,
+)
+from apps.chat_service.backplane import broadcast_backplane
 from apps.chat_service.chat.router import router
+from apps.chat_service.chat.services.chat_cache import chat_cache
+from apps.chat_service.message.schemas import (
+    MessageCreateSchema,
+    MessagePageSchema,
+    MessageSearchPageSchema,
+)
 from apps.chat_service.message.services.message_service import MessageService
-from apps.core.database import get_session
+from apps.chat_service.message.services.search_service import message_search_service
+from apps.chat_service.message.services.message_writer import message_writer
+from apps.core.config import settings
+from apps.core.database import get_read_session, get_session
+from apps.core.exeptions import ObjectDoesntExist
 from apps.core.managers.connection_manager import connection_manager
+from apps.core.rate_limiter import TokenBucketLimiter
 from apps.core.schema_base import AuthenticatedUser
 
+user_rate_limiter = TokenBucketLimiter(
+    settings.RATE_LIMIT_USER_RATE,
+    settings.RATE_LIMIT_USER_BURST,
+    settings.RATE_LIMIT_IDLE_TTL,
+)
+chat_rate_limiter = TokenBucketLimiter(
+    settings.RATE_LIMIT_CHAT_RATE,
+    settings.RATE_LIMIT_CHAT_BURST,
+    settings.RATE_LIMIT_IDLE_TTL,
+)
+
 
 @router.websocket("/{chat_id}/send")
 async def websocket_endpoint(
@@ -19,21 +46,96 @@ async def websocket_endpoint(
         chat_id: int
 ):
     print(current_user)
-    await connection_manager.connect(chat_id, current_user.uuid, websocket)
+    try:
+        await chat_cache.get(chat_id)
+    except ObjectDoesntExist:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    connection = await connection_manager.connect(chat_id, current_user.uuid, websocket)
     try:
         while True:
             message = await websocket.receive_text()
             print(message)
-            async for session in get_session():
-                data = {
-                    'content': message,
-                    'user_uid': current_user.uuid,
-                    'username': current_user.username,
-                    'email': 'current_user',
-                    'chat_id': chat_id
-                }
-                await MessageService(session).save_message(data)
-            await connection_manager.broadcast(chat_id, f"Сообщение: {message}", exclude_user=current_user.uuid)
-            await asyncio.sleep(3)
+            retry_after = user_rate_limiter.acquire(current_user.uuid)
+            if not retry_after:
+                retry_after = chat_rate_limiter.acquire(chat_id)
+                if retry_after:
+                    user_rate_limiter.refund(current_user.uuid)
+            if retry_after:
+                await connection_manager.send(
+                    connection, {'type': 'rate_limited', 'retry_after': retry_after}
+                )
+                continue
+            data = {
+                'content': message,
+                'user_uid': current_user.uuid,
+                'username': current_user.username,
+                'email': 'current_user',
+                'chat_id': chat_id
+            }
+            try:
+                await message_writer.put(
+                    MessageCreateSchema(**data),
+                    wait_durable=settings.MESSAGE_ACK_DURABLE,
+                )
+            except Exception:
+                # Сообщение не сохранено: сообщаем клиенту и продолжаем сессию
+                await connection_manager.send(
+                    connection, {'type': 'error', 'detail': 'message_not_saved'}
+                )
+                continue
+            if settings.MESSAGE_ACK_DURABLE:
+                await connection_manager.send(connection, {'type': 'ack'})
+            await broadcast_backplane.publish(chat_id, f"Сообщение: {message}", exclude=connection)
     except WebSocketDisconnect:
-        connection_manager.disconnect(chat_id, current_user.uuid)
+        pass
+    finally:
+        connection_manager.disconnect(connection)
+
+
+@router.get(
+    '/{chat_id}/messages',
+    summary='История сообщений чата',
+    description='Keyset-пагинация по (created_at, id): курсоры before/after',
+    response_model=MessagePageSchema,
+)
+async def get_chat_messages(
+    chat_id: int,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    read_session: Annotated[AsyncSession, Depends(get_read_session)],
+    current_user: Annotated[AuthenticatedUser, Depends(get_data_from_access_token)],
+    limit: Annotated[int, Query(ge=1, le=200)] = 50,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+):
+    await chat_cache.get(chat_id, session)
+    return await MessageService(session, read_session).get_history(
+        chat_id, limit, before=before, after=after
+    )
+
+
+@router.get(
+    '/search',
+    summary='Поиск по сообщениям',
+    description='Полнотекстовый поиск с подсветкой, пагинация через курсор search_after',
+    response_model=MessageSearchPageSchema,
+)
+async def search_messages(
+    current_user: Annotated[AuthenticatedUser, Depends(get_data_from_access_token)],
+    q: Annotated[str, Query(min_length=1)],
+    chat_id: Optional[int] = None,
+    user_uid: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: Optional[str] = None,
+):
+    return await message_search_service.search(
+        q,
+        limit,
+        chat_id=chat_id,
+        user_uid=user_uid,
+        date_from=date_from,
+        date_to=date_to,
+        cursor=cursor,
+    )
@@ -1,4 +1,7 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
 
 
 
@@ -18,5 +21,34 @@ class MessageUpdateSchema(MessageBaseSchema):
 
 
 class MessageDetailSchema(MessageCreateSchema):
-    pass
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    created_at: datetime
+
+
+class MessageArchiveSchema(MessageDetailSchema):
+    chat_id: Optional[int] = None
+    modified_at: datetime
+
+
+class MessagePageSchema(BaseModel):
+    items: list[MessageDetailSchema]
+    older_cursor: Optional[str] = None
+    newer_cursor: Optional[str] = None
+
+
+class MessageSearchHitSchema(BaseModel):
+    id: int
+    chat_id: Optional[int] = None
+    user_uid: str
+    username: str
+    content: str
+    created_at: datetime
+    highlight: list[str] = []
+
+
+class MessageSearchPageSchema(BaseModel):
+    items: list[MessageSearchHitSchema]
+    next_cursor: Optional[str] = None
 
@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from sqlalchemy import and_, delete
+
+from apps.chat_service.message.models import Message
+from apps.chat_service.message.repository import MessageRepository
+from apps.chat_service.message.schemas import MessageArchiveSchema
+from apps.core.config import settings
+from apps.core.database import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class LocalArchiveStorage:
+    """
+    Файловое хранилище архива; заменяет объектное хранилище (S3 и т.п.).
+
+    Запись атомарна: файл пишется во временный и затем переименовывается,
+    поэтому после сбоя не остаётся недописанных частей.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def write_bytes(self, name: str, data: bytes):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+
+    def read_bytes(self, name: str) -> bytes:
+        return (self.root / name).read_bytes()
+
+    def exists(self, name: str) -> bool:
+        return (self.root / name).exists()
+
+
+class MessageArchiver:
+    """
+    Архивация старых сообщений в сжатые JSONL-файлы и их восстановление.
+
+    Сообщения старше `before` читаются keyset-пагинацией по (created_at, id)
+    пачками по `batch_size`, каждая в своей короткой транзакции, чтобы долгий
+    снимок не мешал VACUUM. Каждая пачка пишется в отдельный `part-NNNNNN.jsonl.gz`,
+    после чего её строки удаляются из БД короткими транзакциями по
+    `delete_chunk_size`. Ход работы сохраняется в `manifest.json`: часть и
+    ключ её последней строки записываются в манифест со статусом `written` до
+    удаления, часть получает статус `deleted` после него, поэтому прерванный
+    запуск можно просто повторить - он продолжит с сохранённого ключа.
+    """
+
+    def __init__(
+        self,
+        storage: LocalArchiveStorage,
+        batch_size: int = settings.MESSAGE_ARCHIVE_BATCH_SIZE,
+        delete_chunk_size: int = settings.MESSAGE_ARCHIVE_DELETE_CHUNK,
+    ):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.delete_chunk_size = delete_chunk_size
+
+    async def archive(self, before: datetime) -> int:
+        """Архивирует и удаляет сообщения с `created_at` < `before`, возвращает их число."""
+
+        manifest = self._load_manifest()
+        if manifest is None:
+            manifest = {'before': before.isoformat(), 'parts': []}
+            self._save_manifest(manifest)
+        elif datetime.fromisoformat(manifest['before']) != before:
+            raise ValueError(
+                f"Archive in {self.storage.root} was started with before={manifest['before']}"
+            )
+
+        # Дочищаем части, записанные до сбоя, но ещё не удалённые из БД
+        for part in manifest['parts']:
+            if part['status'] == 'written':
+                await self._delete(
+                    [(row.id, row.created_at) for row in self._read_part(part['name'])]
+                )
+                part['status'] = 'deleted'
+                self._save_manifest(manifest)
+
+        archived = 0
+        last_key = manifest.get('last_key')
+        after = (
+            (datetime.fromisoformat(last_key['created_at']), last_key['id'])
+            if last_key
+            else None
+        )
+        while True:
+            # Читаем из основной БД: реплика с задержкой вернула бы уже удалённые строки
+            async with AsyncSession() as session:
+                batch = await MessageRepository(session).get_older_than(
+                    before, self.batch_size, after=after
+                )
+                rows = [MessageArchiveSchema.model_validate(message) for message in batch]
+            if not rows:
+                break
+            after = (rows[-1].created_at, rows[-1].id)
+            name = f"part-{len(manifest['parts']) + 1:06d}.jsonl.gz"
+            self.storage.write_bytes(name, self._encode_part(rows))
+            part = {
+                'name': name,
+                'count': len(rows),
+                'first_id': rows[0].id,
+                'last_id': rows[-1].id,
+                'status': 'written',
+            }
+            manifest['parts'].append(part)
+            manifest['last_key'] = {'created_at': after[0].isoformat(), 'id': after[1]}
+            self._save_manifest(manifest)
+
+            await self._delete([(row.id, row.created_at) for row in rows])
+            part['status'] = 'deleted'
+            self._save_manifest(manifest)
+            archived += len(rows)
+            logger.info('Archived %s messages to %s', len(rows), name)
+        return archived
+
+    async def restore(self) -> int:
+        """
+        Возвращает в БД все архивированные сообщения.
+
+        Вставка идёт через INSERT ... ON CONFLICT DO NOTHING, поэтому
+        повторный или прерванный запуск безопасен.
+        """
+
+        manifest = self._load_manifest()
+        if manifest is None:
+            raise FileNotFoundError(f'No archive manifest in {self.storage.root}')
+        restored = 0
+        for part in manifest['parts']:
+            rows = list(self._read_part(part['name']))
+            async with AsyncSession() as session:
+                restored += await MessageRepository(session).bulk_upsert(
+                    rows, conflict_columns=['id', 'created_at'], update_columns=[]
+                )
+                await session.commit()
+            logger.info('Restored %s', part['name'])
+        return restored
+
+    async def _delete(self, keys: list[tuple[int, datetime]]):
+        for i in range(0, len(keys), self.delete_chunk_size):
+            chunk = keys[i:i + self.delete_chunk_size]
+            created = [created_at for _, created_at in chunk]
+            async with AsyncSession() as session:
+                # Диапазон по created_at позволяет отсечь лишние партиции
+                await session.execute(
+                    delete(Message).where(
+                        and_(
+                            Message.id.in_([message_id for message_id, _ in chunk]),
+                            Message.created_at.between(min(created), max(created)),
+                        )
+                    )
+                )
+                await session.commit()
+
+    @staticmethod
+    def _encode_part(rows: list[MessageArchiveSchema]) -> bytes:
+        lines = '\n'.join(row.model_dump_json() for row in rows)
+        return gzip.compress(lines.encode('utf-8'))
+
+    def _read_part(self, name: str) -> Iterator[MessageArchiveSchema]:
+        data = gzip.decompress(self.storage.read_bytes(name))
+        for line in data.splitlines():
+            if line.strip():
+                yield MessageArchiveSchema.model_validate_json(line)
+
+    def _load_manifest(self) -> Optional[dict]:
+        if not self.storage.exists(MANIFEST_NAME):
+            return None
+        return json.loads(self.storage.read_bytes(MANIFEST_NAME))
+
+    def _save_manifest(self, manifest: dict):
+        self.storage.write_bytes(
+            MANIFEST_NAME, json.dumps(manifest, indent=2).encode('utf-8')
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Архивация сообщений чатов')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    archive_parser = subparsers.add_parser('archive', help='Выгрузить и удалить старые сообщения')
+    archive_parser.add_argument(
+        '--before',
+        type=datetime.fromisoformat,
+        required=True,
+        help='Граница по created_at в формате ISO 8601, без зоны считается UTC',
+    )
+    restore_parser = subparsers.add_parser('restore', help='Вернуть сообщения из архива')
+    for subparser in (archive_parser, restore_parser):
+        subparser.add_argument('--dest', default=settings.MESSAGE_ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    archiver = MessageArchiver(LocalArchiveStorage(args.dest))
+    if args.command == 'archive':
+        before = args.before
+        if before.tzinfo is None:
+            before = before.replace(tzinfo=timezone.utc)
+        print(asyncio.run(archiver.archive(before)))
+    else:
+        print(asyncio.run(archiver.restore()))
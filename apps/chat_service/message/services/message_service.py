@@ -1,15 +1,51 @@
+from typing import Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from apps.chat_service.message.repository import MessageRepository
-from apps.chat_service.message.schemas import MessageCreateSchema
+from apps.chat_service.message.schemas import (
+    MessageCreateSchema,
+    MessageDetailSchema,
+    MessagePageSchema,
+)
+from apps.chat_service.message.utils import decode_cursor, encode_cursor
 
 
 class MessageService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, read_session: Optional[AsyncSession] = None):
         self._session = session
-        self._repository = MessageRepository(session)
+        self._repository = MessageRepository(session, read_session)
 
     async def save_message(self, message: dict):
         schema = MessageCreateSchema(**message)
         message = await self._repository.create(schema)
         await self._session.commit()
+
+    async def get_history(
+        self,
+        chat_id: int,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+    ) -> MessagePageSchema:
+        rows = await self._repository.get_chat_page(
+            chat_id,
+            limit + 1,
+            before=decode_cursor(before) if before else None,
+            after=decode_cursor(after) if after else None,
+        )
+        has_more = len(rows) > limit
+        rows = list(rows[:limit])
+        if not after:
+            rows.reverse()
+
+        items = [MessageDetailSchema.model_validate(row) for row in rows]
+        page = MessagePageSchema(items=items)
+        if items:
+            oldest, newest = items[0], items[-1]
+            # При движении вперёд более старые сообщения точно есть, и наоборот
+            if after or has_more:
+                page.older_cursor = encode_cursor(oldest.created_at, oldest.id)
+            if before or (after and has_more):
+                page.newer_cursor = encode_cursor(newest.created_at, newest.id)
+        return page
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from apps.chat_service.message.repository import MessageRepository
+from apps.chat_service.message.schemas import MessageCreateSchema
+from apps.chat_service.message.utils import message_to_document
+from apps.core.config import settings
+from apps.core.database import AsyncSession
+from apps.core.exeptions import ForeignKeyViolationError, UniqueViolationError
+from apps.core.services.elasticsearch_indexer import BulkIndexer, SpillStore
+
+logger = logging.getLogger(__name__)
+
+# Ошибки конкретных строк: повтор не поможет, пачку нужно делить
+ROW_ERRORS = (IntegrityError, UniqueViolationError, ForeignKeyViolationError)
+
+Batch = list[tuple[MessageCreateSchema, Optional[asyncio.Future]]]
+
+
+class MessageWriter:
+    """
+    Отложенная (write-behind) запись сообщений чата.
+
+    Сообщения складываются в ограниченную очередь, фоновая задача сбрасывает их
+    в БД пачками через multi-row INSERT, как только набирается
+    `batch_size` сообщений или проходит `flush_interval` секунд.
+    Если очередь заполнена, `put` ждёт освобождения места (backpressure).
+    Временные сбои БД повторяются с экспоненциальной задержкой, а при нарушении
+    ограничений пачка делится пополам, пока не останется отвергнутая строка,
+    поэтому одно плохое сообщение не теряет остальные.
+    Записанные сообщения передаются в `indexer` для полнотекстового поиска
+    без ожидания: при отставании Elasticsearch документы откладываются на диск
+    и дозагружаются позже (`search_backfill`), а запись в БД не замедляется.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = settings.MESSAGE_QUEUE_SIZE,
+        batch_size: int = settings.MESSAGE_FLUSH_BATCH_SIZE,
+        flush_interval: float = settings.MESSAGE_FLUSH_INTERVAL,
+        indexer: Optional[BulkIndexer] = None,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.indexer = indexer
+        self._queue: asyncio.Queue[
+            tuple[MessageCreateSchema, Optional[asyncio.Future]]
+        ] = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Дожидается записи всех сообщений из очереди и останавливает задачу."""
+
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def put(self, message: MessageCreateSchema, wait_durable: bool = False):
+        """
+        Ставит сообщение в очередь на запись.
+
+        При `wait_durable=True` возвращает управление только после фиксации
+        транзакции, в которую попало сообщение.
+        """
+
+        future = asyncio.get_running_loop().create_future() if wait_durable else None
+        await self._queue.put((message, future))
+        if future is not None:
+            await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: Batch):
+        documents = await self._write(batch)
+        if self.indexer is not None and documents:
+            queued = await self.indexer.try_add_many(
+                [(document['id'], document) for document in documents]
+            )
+            if queued < len(documents):
+                logger.warning(
+                    'Search indexer is full, %s chat messages deferred to backfill',
+                    len(documents) - queued,
+                )
+
+    async def _write(self, batch: Batch) -> list[dict]:
+        """Записывает пачку с повторами, возвращает документы записанных сообщений."""
+
+        for attempt in range(settings.MESSAGE_FLUSH_MAX_RETRIES + 1):
+            try:
+                documents = await self._insert(batch)
+            except ROW_ERRORS as e:
+                return await self._split(batch, e)
+            except Exception as e:
+                if attempt == settings.MESSAGE_FLUSH_MAX_RETRIES:
+                    logger.exception('Failed to flush %s chat messages', len(batch))
+                    self._resolve(batch, e)
+                    return []
+                logger.warning(
+                    'Flush of %s chat messages failed, retrying: %s', len(batch), e
+                )
+                await asyncio.sleep(settings.MESSAGE_FLUSH_RETRY_BACKOFF * 2 ** attempt)
+                continue
+            self._resolve(batch)
+            return documents
+        return []
+
+    async def _split(self, batch: Batch, error: Exception) -> list[dict]:
+        if len(batch) == 1:
+            message, _ = batch[0]
+            logger.error(
+                'Rejected chat message from %s in chat %s: %s',
+                message.user_uid, message.chat_id, error,
+            )
+            self._resolve(batch, error)
+            return []
+        middle = len(batch) // 2
+        return await self._write(batch[:middle]) + await self._write(batch[middle:])
+
+    @staticmethod
+    async def _insert(batch: Batch) -> list[dict]:
+        async with AsyncSession() as session:
+            db_objects = await MessageRepository(session).bulk_create(
+                [message for message, _ in batch]
+            )
+            documents = [message_to_document(obj) for obj in db_objects]
+            await session.commit()
+        return documents
+
+    @staticmethod
+    def _resolve(batch: Batch, error: Optional[Exception] = None):
+        for _, future in batch:
+            if future is None or future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+
+message_indexer = BulkIndexer(
+    settings.ES_INDEX,
+    spill=(
+        SpillStore(settings.ES_SPILL_DIR, settings.ES_INDEX)
+        if settings.ES_SPILL_DIR
+        else None
+    ),
+)
+message_writer = MessageWriter(indexer=message_indexer)
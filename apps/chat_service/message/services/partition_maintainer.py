@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.chat_service.message.models import Message
+from apps.core.config import settings
+from apps.core.database import AsyncSession as SessionFactory
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = Message.__tablename__
+DEFAULT_PARTITION = f'{TABLE_NAME}_default'
+PARTITION_NAME_RE = re.compile(rf'^{TABLE_NAME}_p(\d{{4}})_(\d{{2}})$')
+
+
+def month_start(value: datetime) -> datetime:
+    """Начало месяца в UTC, в который попадает `value`."""
+
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f'{TABLE_NAME}_p{month:%Y_%m}'
+
+
+class PartitionMaintainer:
+    """
+    Обслуживание помесячных партиций `chat_message`.
+
+    Заранее создаёт партиции на `months_ahead` месяцев вперёд, чтобы новые
+    сообщения не попадали в DEFAULT-партицию. Строки, всё же попавшие в
+    DEFAULT (например, загруженные задним числом), переносятся в партиции
+    своих месяцев, которые создаются по мере необходимости. Партиции старше
+    `retention_months` месяцев отсоединяются (`detach`) или удаляются (`drop`);
+    при `retention_months=0` данные хранятся бессрочно. Узлы сервиса
+    сериализуют обслуживание через advisory-блокировку.
+    """
+
+    def __init__(
+        self,
+        months_ahead: int = settings.MESSAGE_PARTITIONS_AHEAD,
+        retention_months: int = settings.MESSAGE_RETENTION_MONTHS,
+        expired_action: str = settings.MESSAGE_EXPIRED_PARTITION_ACTION,
+        interval: float = settings.MESSAGE_PARTITION_CHECK_INTERVAL,
+    ):
+        if expired_action not in ('detach', 'drop'):
+            raise ValueError(f'Unknown expired partition action: {expired_action}')
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.expired_action = expired_action
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self, now: Optional[datetime] = None) -> dict[str, list[str]]:
+        """Создаёт недостающие и обрабатывает устаревшие партиции в одной транзакции."""
+
+        now = now or datetime.now(timezone.utc)
+        async with SessionFactory() as session:
+            await session.execute(
+                text('SELECT pg_advisory_xact_lock(hashtext(:key))'),
+                {'key': f'{TABLE_NAME}_partitions'},
+            )
+            created = await self.ensure_partitions(session, now)
+            expired = await self.expire_partitions(session, now)
+            await session.commit()
+        return {'created': created, 'expired': expired}
+
+    async def ensure_partitions(self, session: AsyncSession, now: datetime) -> list[str]:
+        existing = set(await self._partition_months(session))
+        default_months = set(await self._default_months(session))
+        current = month_start(now)
+        months = {add_months(current, offset) for offset in range(self.months_ahead + 1)}
+        created = []
+        for month in sorted((months | default_months) - existing):
+            await self._create_partition(session, month, month in default_months)
+            created.append(partition_name(month))
+        return created
+
+    async def _create_partition(
+        self, session: AsyncSession, month: datetime, has_default_rows: bool
+    ):
+        name = partition_name(month)
+        bounds = {'start': month, 'end': add_months(month, 1)}
+        if has_default_rows:
+            # Партицию нельзя создать, пока строки её диапазона лежат в DEFAULT:
+            # переносим их во временную таблицу и возвращаем после создания
+            await session.execute(
+                text(
+                    f'CREATE TEMP TABLE "{name}_moving" '
+                    f'(LIKE "{TABLE_NAME}") ON COMMIT DROP'
+                )
+            )
+            await session.execute(
+                text(
+                    f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+                    'WHERE created_at >= :start AND created_at < :end RETURNING *) '
+                    f'INSERT INTO "{name}_moving" SELECT * FROM moved'
+                ),
+                bounds,
+            )
+        await session.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{TABLE_NAME}" '
+                f"FOR VALUES FROM ('{bounds['start'].isoformat()}') "
+                f"TO ('{bounds['end'].isoformat()}')"
+            )
+        )
+        if has_default_rows:
+            await session.execute(
+                text(f'INSERT INTO "{TABLE_NAME}" SELECT * FROM "{name}_moving"')
+            )
+            await session.execute(text(f'DROP TABLE "{name}_moving"'))
+
+    async def expire_partitions(self, session: AsyncSession, now: datetime) -> list[str]:
+        if self.retention_months <= 0:
+            return []
+        cutoff = add_months(month_start(now), -self.retention_months)
+        expired = []
+        for month in sorted(await self._partition_months(session)):
+            if add_months(month, 1) > cutoff:
+                break
+            name = partition_name(month)
+            if self.expired_action == 'drop':
+                await session.execute(text(f'DROP TABLE "{name}"'))
+            else:
+                # Отсоединённая таблица остаётся в БД, например для архивации
+                await session.execute(
+                    text(f'ALTER TABLE "{TABLE_NAME}" DETACH PARTITION "{name}"')
+                )
+            expired.append(name)
+        return expired
+
+    @staticmethod
+    async def _default_months(session: AsyncSession) -> list[datetime]:
+        """Месяцы (UTC), строки которых лежат в DEFAULT-партиции."""
+
+        result = await session.execute(
+            text(
+                "SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC') "
+                f'FROM "{DEFAULT_PARTITION}"'
+            )
+        )
+        return [month.replace(tzinfo=timezone.utc) for month in result.scalars()]
+
+    @staticmethod
+    async def _partition_months(session: AsyncSession) -> list[datetime]:
+        result = await session.execute(
+            text(
+                'SELECT child.relname FROM pg_inherits '
+                'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+                'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                'WHERE parent.relname = :table'
+            ),
+            {'table': TABLE_NAME},
+        )
+        months = []
+        for name in result.scalars():
+            match = PARTITION_NAME_RE.match(name)
+            if match:
+                year, month = map(int, match.groups())
+                months.append(datetime(year, month, 1, tzinfo=timezone.utc))
+        return months
+
+    async def _run(self):
+        while True:
+            try:
+                result = await self.run_once()
+                if any(result.values()):
+                    logger.info('Message partitions maintained: %s', result)
+            except Exception:
+                logger.exception('Message partition maintenance failed')
+            await asyncio.sleep(self.interval)
+
+
+partition_maintainer = PartitionMaintainer()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Обслуживание партиций chat_message')
+    parser.add_argument('--months-ahead', type=int, default=settings.MESSAGE_PARTITIONS_AHEAD)
+    parser.add_argument('--retention-months', type=int, default=settings.MESSAGE_RETENTION_MONTHS)
+    parser.add_argument(
+        '--expired-action',
+        choices=('detach', 'drop'),
+        default=settings.MESSAGE_EXPIRED_PARTITION_ACTION,
+    )
+    args = parser.parse_args()
+    maintainer = PartitionMaintainer(
+        args.months_ahead, args.retention_months, args.expired_action, interval=0
+    )
+    print(asyncio.run(maintainer.run_once()))
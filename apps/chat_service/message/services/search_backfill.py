@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from apps.chat_service.message.repository import MessageRepository
+from apps.chat_service.message.services.message_writer import message_indexer
+from apps.chat_service.message.utils import message_to_document
+from apps.core.config import settings
+from apps.core.database import ReadAsyncSession
+from apps.core.services.elasticsearch_indexer import BulkIndexer, SpillStore
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill(
+    indexer: BulkIndexer,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    now: Optional[datetime] = None,
+) -> int:
+    """
+    Дозагружает в индекс сообщения, не попавшие туда при записи.
+
+    Переотправляет документы из закрытых spill-файлов индексатора, а если
+    задан период - ещё и сообщения из БД с `created_at` в [`since`, `until`]
+    (например, после сбоя, когда документы были только в памяти). Отправка
+    идёт через `BulkIndexer.add` с backpressure. Spill-файлы удаляются после
+    остановки индексатора, то есть после отправки всех документов; то, что
+    снова не удалось отправить, индексатор запишет в новые файлы.
+    Возвращает число переданных в индексатор документов.
+    """
+
+    files = indexer.spill.closed_files(now) if indexer.spill is not None else []
+    sent = 0
+    await indexer.start()
+    try:
+        if since is not None or until is not None:
+            sent += await _reindex_range(indexer, since, until)
+        for path in files:
+            for doc_id, document in SpillStore.read(path):
+                await indexer.add(doc_id, document)
+                sent += 1
+            logger.info('Replayed %s', path.name)
+    finally:
+        await indexer.stop()
+    for path in files:
+        path.unlink()
+    return sent
+
+
+async def _reindex_range(
+    indexer: BulkIndexer,
+    since: Optional[datetime],
+    until: Optional[datetime],
+    batch_size: int = 1000,
+) -> int:
+    sent = 0
+    async with ReadAsyncSession() as session:
+        batches = MessageRepository(session).iter_batches(
+            batch_size, start_date=since, end_date=until
+        )
+        async for batch in batches:
+            for message in batch:
+                document = message_to_document(message)
+                await indexer.add(document['id'], document)
+            sent += len(batch)
+    return sent
+
+
+def parse_datetime(value: str) -> datetime:
+    result = datetime.fromisoformat(value)
+    return result if result.tzinfo else result.replace(tzinfo=timezone.utc)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Дозагрузка сообщений чатов в поисковый индекс'
+    )
+    parser.add_argument(
+        '--since',
+        type=parse_datetime,
+        help='Переиндексировать из БД сообщения с этого момента (ISO 8601, без зоны - UTC)',
+    )
+    parser.add_argument('--until', type=parse_datetime, help='Верхняя граница для --since')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    print(asyncio.run(backfill(message_indexer, args.since, args.until)))
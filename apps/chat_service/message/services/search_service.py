@@ -0,0 +1,85 @@
+from datetime import datetime
+from typing import Optional
+
+from apps.chat_service.message.schemas import (
+    MessageSearchHitSchema,
+    MessageSearchPageSchema,
+)
+from apps.chat_service.message.utils import decode_search_cursor, encode_search_cursor
+from apps.core.config import settings
+from apps.core.services.elasticsearch_service import ElasticsearchService
+
+SOURCE_FIELDS = ['id', 'chat_id', 'user_uid', 'username', 'content', 'created_at']
+
+
+class MessageSearchService:
+    """
+    Полнотекстовый поиск по сообщениям в индексе `settings.ES_INDEX`.
+
+    Глубокая пагинация идёт через `search_after` по (score, id), поэтому
+    стоимость страницы не растёт с её номером, в отличие от from/size.
+    """
+
+    def __init__(self, service: Optional[ElasticsearchService] = None):
+        self._service = service
+
+    @property
+    def service(self) -> ElasticsearchService:
+        if self._service is None:
+            self._service = ElasticsearchService()
+        return self._service
+
+    async def search(
+        self,
+        query: str,
+        limit: int,
+        chat_id: Optional[int] = None,
+        user_uid: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+    ) -> MessageSearchPageSchema:
+        filters = []
+        if chat_id is not None:
+            filters.append({'term': {'chat_id': chat_id}})
+        if user_uid:
+            filters.append({'term': {'user_uid': user_uid}})
+        if date_from or date_to:
+            date_range = {}
+            if date_from:
+                date_range['gte'] = date_from.isoformat()
+            if date_to:
+                date_range['lte'] = date_to.isoformat()
+            filters.append({'range': {'created_at': date_range}})
+
+        params = {
+            'size': limit,
+            'sort': [{'_score': 'desc'}, {'id': 'desc'}],
+            'source': SOURCE_FIELDS,
+            'highlight': {'fields': {'content': {}}},
+            'track_total_hits': False,
+        }
+        if cursor:
+            params['search_after'] = decode_search_cursor(cursor)
+
+        response = await self.service.search(
+            settings.ES_INDEX,
+            {'bool': {'must': [{'match': {'content': query}}], 'filter': filters}},
+            **params,
+        )
+        hits = response['hits']['hits']
+        page = MessageSearchPageSchema(
+            items=[
+                MessageSearchHitSchema(
+                    **hit['_source'],
+                    highlight=hit.get('highlight', {}).get('content', []),
+                )
+                for hit in hits
+            ]
+        )
+        if len(hits) == limit:
+            page.next_cursor = encode_search_cursor(hits[-1]['sort'])
+        return page
+
+
+message_search_service = MessageSearchService()
@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+from apps.chat_service.message.models import Message
+from apps.core.codecs import json_dumpb
+from apps.core.exeptions import InvalidCursorError
+
+
+def encode_cursor(created_at: datetime, message_id: int) -> str:
+    """Кодирует позицию (created_at, id) в непрозрачный курсор."""
+
+    raw = f'{created_at.isoformat()}|{message_id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, message_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (ValueError, UnicodeError):
+        raise InvalidCursorError(cursor)
+
+
+def encode_search_cursor(sort_values: list[Any]) -> str:
+    """Кодирует значения `sort` последнего хита для search_after."""
+
+    return base64.urlsafe_b64encode(json_dumpb(sort_values)).decode('ascii')
+
+
+def decode_search_cursor(cursor: str) -> list[Any]:
+    try:
+        sort_values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise InvalidCursorError(cursor)
+    if not isinstance(sort_values, list):
+        raise InvalidCursorError(cursor)
+    return sort_values
+
+
+def message_to_document(message: Message) -> dict:
+    """Документ сообщения для индекса Elasticsearch."""
+
+    return {
+        'id': message.id,
+        'chat_id': message.chat_id,
+        'user_uid': message.user_uid,
+        'username': message.username,
+        'email': message.email,
+        'content': message.content,
+        'created_at': message.created_at.isoformat(),
+    }
@@ -1,25 +0,0 @@
-from aiokafka import AIOKafkaProducer
-import json
-import asyncio
-
-
-class KafkaProducer:
-    def __init__(self, bootstrap_servers: str = "localhost:9092"):
-        self.bootstrap_servers = bootstrap_servers
-        self.producer = None
-
-    async def start(self):
-        self.producer = AIOKafkaProducer(
-            bootstrap_servers=self.bootstrap_servers,
-            value_serializer=lambda v: json.dumps(v).encode('utf-8')
-        )
-        await self.producer.start()
-
-    async def stop(self):
-        if self.producer:
-            await self.producer.stop()
-
-    async def send_message(self, topic: str, message: dict):
-        if not self.producer:
-            raise Exception("Producer not started")
-        await self.producer.send(topic, message)
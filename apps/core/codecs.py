@@ -0,0 +1,131 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack необязателен
+    msgpack = None
+
+# Заголовок конверта: magic-байт, версия конверта, id кодека.
+# 0xCC не может быть первым байтом JSON, поэтому сообщения без конверта
+# (старые продюсеры) распознаются и читаются как обычный JSON.
+ENVELOPE_MAGIC = 0xCC
+ENVELOPE_VERSION = 1
+ENVELOPE_HEADER_SIZE = 3
+
+
+def json_dumpb(value: Any) -> bytes:
+    """Сериализует значение в компактный JSON (UTF-8), используя orjson, если он есть."""
+
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_dumps(value: Any) -> str:
+    """То же, что `json_dumpb`, но возвращает строку для текстовых фреймов."""
+
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class Codec:
+    """Базовый кодек значений сообщений."""
+
+    codec_id: int
+    name: str
+
+    def encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    codec_id = 1
+    name = 'json'
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(Codec):
+    codec_id = 2
+    name = 'orjson'
+
+    def encode(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def decode(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(Codec):
+    codec_id = 3
+    name = 'msgpack'
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS: dict[int, Codec] = {JsonCodec.codec_id: JsonCodec()}
+if orjson is not None:
+    CODECS[OrjsonCodec.codec_id] = OrjsonCodec()
+if msgpack is not None:
+    CODECS[MsgpackCodec.codec_id] = MsgpackCodec()
+
+
+def get_codec(name: str) -> Codec:
+    for codec in CODECS.values():
+        if codec.name == name:
+            return codec
+    raise ValueError(f'Кодек {name} не поддерживается или не установлен')
+
+
+def encode_envelope(value: Any, codec: Codec) -> bytes:
+    header = bytes((ENVELOPE_MAGIC, ENVELOPE_VERSION, codec.codec_id))
+    return header + codec.encode(value)
+
+
+def decode_envelope(data: bytes) -> Any:
+    """Декодирует сообщение в конверте любого известного кодека или обычный JSON."""
+
+    if not data or data[0] != ENVELOPE_MAGIC:
+        return CODECS[JsonCodec.codec_id].decode(data)
+    version, codec_id = data[1], data[2]
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f'Неподдерживаемая версия конверта: {version}')
+    codec = CODECS.get(codec_id)
+    if codec is None:
+        raise ValueError(f'Неизвестный или неустановленный кодек: {codec_id}')
+    return codec.decode(data[ENVELOPE_HEADER_SIZE:])
+
+
+def make_serializer(codec_name: str, envelope: bool):
+    """
+    Сериализатор значений для продюсера.
+
+    Без конверта пишет голый JSON, который понимают и старые консьюмеры:
+    сначала обновляются консьюмеры, затем у продюсеров включается конверт
+    и при необходимости меняется кодек.
+    """
+
+    codec = get_codec(codec_name)
+    if not envelope:
+        if codec.codec_id == MsgpackCodec.codec_id:
+            raise ValueError('Кодек msgpack можно использовать только с конвертом')
+        return codec.encode
+    return lambda value: encode_envelope(value, codec)
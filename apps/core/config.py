@@ -23,6 +23,14 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str
     POSTGRES_PORT: str
     POSTGRES_DB: str
+    # Реплика для чтения; если не задана, все запросы идут в основную БД
+    POSTGRES_REPLICA_HOST: str | None = None
+    POSTGRES_REPLICA_PORT: str | None = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # секунды ожидания свободного соединения
+    DB_POOL_RECYCLE: int = 30 * 60  # секунды, -1 - не пересоздавать
+    DB_STATEMENT_CACHE_SIZE: int = 100
 
     # ELASTICSEARCH
     ES_INDEX: str = 'my_index'
@@ -30,6 +38,80 @@ class Settings(BaseSettings):
     ES_PORT: int = 9200
     ES_USER: str = 'user'
     ES_PASSWORD: str = 'password'
+    ES_BULK_MAX_DOCS: int = 1000
+    ES_BULK_MAX_BYTES: int = 5 * 1024 * 1024
+    ES_BULK_MAX_AGE: float = 1.0  # секунды
+    ES_BULK_MAX_PENDING_BYTES: int = 50 * 1024 * 1024
+    ES_BULK_MAX_RETRIES: int = 5
+    ES_BULK_RETRY_BACKOFF: float = 0.5  # секунды, удваивается с каждой попыткой
+    # Документы, которые не удалось отправить (буфер переполнен, повторы
+    # исчерпаны), дописываются сюда и дозагружаются командой
+    # `python -m apps.chat_service.message.services.search_backfill`;
+    # пусто - такие документы теряются
+    ES_SPILL_DIR: str | None = 'es_spill'
+
+    # CHAT MESSAGES
+    MESSAGE_QUEUE_SIZE: int = 10_000
+    MESSAGE_FLUSH_BATCH_SIZE: int = 500
+    MESSAGE_FLUSH_INTERVAL: float = 0.05  # секунды
+    MESSAGE_ACK_DURABLE: bool = False
+    MESSAGE_FLUSH_MAX_RETRIES: int = 5
+    MESSAGE_FLUSH_RETRY_BACKOFF: float = 0.2  # секунды, удваивается с каждой попыткой
+
+    # CHAT CACHE
+    CHAT_CACHE_SIZE: int = 10_000
+    CHAT_CACHE_TTL: int = 5 * 60  # секунды
+    CHAT_INVALIDATION_TOPIC: str = 'chat-invalidation'
+
+    # MESSAGE PARTITIONS
+    MESSAGE_PARTITIONS_AHEAD: int = 3  # месяцев
+    MESSAGE_RETENTION_MONTHS: int = 0  # 0 - хранить бессрочно
+    MESSAGE_EXPIRED_PARTITION_ACTION: str = 'detach'  # detach | drop
+    MESSAGE_PARTITION_CHECK_INTERVAL: float = 6 * 60 * 60  # секунды, 0 - не запускать
+
+    # MESSAGE ARCHIVE
+    MESSAGE_ARCHIVE_DIR: str = 'archive'
+    MESSAGE_ARCHIVE_BATCH_SIZE: int = 10_000
+    MESSAGE_ARCHIVE_DELETE_CHUNK: int = 1000
+
+    # WEBSOCKET
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_OVERFLOW_POLICY: str = 'drop_oldest'  # drop_oldest | drop_newest | disconnect
+    WS_FRAME_FORMAT: str = 'text'  # text | binary
+
+    # RATE LIMITS (токенов в секунду и размер пачки)
+    RATE_LIMIT_USER_RATE: float = 5.0
+    RATE_LIMIT_USER_BURST: int = 20
+    RATE_LIMIT_CHAT_RATE: float = 50.0
+    RATE_LIMIT_CHAT_BURST: int = 200
+    RATE_LIMIT_IDLE_TTL: float = 5 * 60  # секунды
+
+    # KAFKA
+    KAFKA_BOOTSTRAP_SERVERS: str = 'localhost:9092'
+    KAFKA_ACKS: str = '1'  # 0 | 1 | all
+    KAFKA_LINGER_MS: int = 5
+    KAFKA_MAX_BATCH_SIZE: int = 64 * 1024
+    KAFKA_COMPRESSION_TYPE: str | None = None  # gzip | snappy | lz4 | zstd
+    KAFKA_MAX_IN_FLIGHT: int = 10_000
+    KAFKA_CODEC: str = 'json'  # json | orjson | msgpack
+    KAFKA_ENVELOPE: bool = False
+    KAFKA_CONSUMER_CONCURRENCY: int = 8
+    KAFKA_CONSUMER_MAX_IN_FLIGHT: int = 1000
+    KAFKA_COMMIT_INTERVAL: float = 1.0  # секунды
+    KAFKA_HANDLER_MAX_RETRIES: int = 3
+    KAFKA_HANDLER_RETRY_BACKOFF: float = 0.5  # секунды, удваивается с каждой попыткой
+    # Сообщения, не обработанные после всех повторов, отправляются в этот топик,
+    # и их оффсет коммитится. Без топика оффсет неудачного сообщения не коммитится:
+    # коммиты партиции останавливаются на нём, и после перезапуска или
+    # ребаланса сообщения с этого места будут прочитаны повторно.
+    KAFKA_DEAD_LETTER_TOPIC: str | None = None
+    KAFKA_BATCH_MODE: bool = False
+    KAFKA_BATCH_MAX_RECORDS: int = 500
+    KAFKA_BATCH_TIMEOUT_MS: int = 1000
+    # kafka - рассылка между всеми воркерами и узлами; memory - только внутри
+    # одного процесса (один воркер, тесты)
+    BROADCAST_BACKPLANE: str = 'kafka'  # kafka | memory
+    BROADCAST_TOPIC: str = 'chat-broadcast'
 
     # API VERSION CONFIG
     API_V1: str = '/v1'
@@ -43,6 +125,13 @@ class Settings(BaseSettings):
     AUTH_TOKEN_NAME: str = 'access_token'
     REFRESH_TOKEN_NAME: str = 'refresh_token'
     COOKIE_DOMAIN: str | None = None
+    TOKEN_CACHE_SIZE: int = 10_000
+    TOKEN_CACHE_TTL: int = 5 * 60  # секунды, но не дольше exp самого токена
+
+    # PASSWORD HASHING
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 2.0  # секунды ожидания свободного слота
 
     # COMPUTER FIELDS
     @property
@@ -59,6 +148,16 @@ class Settings(BaseSettings):
             f'{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}'
         )
 
+    @property
+    def DATABASE_REPLICA_A_URL(self) -> str | None:
+        if not self.POSTGRES_REPLICA_HOST:
+            return None
+        return (
+            f'postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@'
+            f'{self.POSTGRES_REPLICA_HOST}:'
+            f'{self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT}/{self.POSTGRES_DB}'
+        )
+
     # Валидация полей
     @model_validator(mode='before')
     @classmethod
@@ -1,14 +1,76 @@
-from sqlalchemy import MetaData
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import time
+
+from sqlalchemy import MetaData, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .config import settings
+from .metrics import (
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_EXHAUSTED,
+    DB_POOL_IN_USE,
+    DB_POOL_TIMEOUTS,
+)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул соединений, который отдаёт в метрики время ожидания и исчерпание пула."""
+
+    engine_name = 'primary'
+
+    def _do_get(self):
+        if self._pool.empty() and self._overflow >= self._max_overflow > -1:
+            # Свободных соединений нет и лимит overflow выбран - запрос будет ждать
+            DB_POOL_EXHAUSTED.labels(self.engine_name).inc()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.labels(self.engine_name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.engine_name).observe(
+                time.perf_counter() - start
+            )
+
+
+def create_engine(url: str, name: str) -> AsyncEngine:
+    pool_class = type(f'{name.title()}Pool', (InstrumentedPool,), {'engine_name': name})
+    db_engine = create_async_engine(
+        url,
+        poolclass=pool_class,
+        pool_use_lifo=True,
+        pool_pre_ping=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args={
+            # Кэш подготовленных выражений SQLAlchemy и самого asyncpg;
+            # 0 - для работы через pgbouncer в transaction-режиме
+            'prepared_statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+            'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    )
+
+    @event.listens_for(db_engine.sync_engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_IN_USE.labels(name).set(db_engine.sync_engine.pool.checkedout())
+
+    @event.listens_for(db_engine.sync_engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        DB_POOL_IN_USE.labels(name).set(db_engine.sync_engine.pool.checkedout())
 
+    return db_engine
 
-engine = create_async_engine(
-    settings.DATABASE_A_URL,
-    pool_use_lifo=True,
-    pool_pre_ping=True,
+
+engine = create_engine(settings.DATABASE_A_URL, 'primary')
+replica_engine = (
+    create_engine(settings.DATABASE_REPLICA_A_URL, 'replica')
+    if settings.DATABASE_REPLICA_A_URL
+    else None
 )
 
 AsyncSession = async_sessionmaker(
@@ -17,6 +79,13 @@ AsyncSession = async_sessionmaker(
     autoflush=False,
 )
 
+# Сессии только для чтения; без реплики работают с основной БД
+ReadAsyncSession = async_sessionmaker(
+    bind=replica_engine or engine,
+    autocommit=False,
+    autoflush=False,
+)
+
 metadata = MetaData(info={'is_tracked': True})
 Base = declarative_base(metadata=metadata)
 
@@ -27,3 +96,11 @@ async def get_session():
             yield session
         finally:
             await session.close()
+
+
+async def get_read_session():
+    async with ReadAsyncSession() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
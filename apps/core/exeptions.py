@@ -55,3 +55,13 @@ class ForeignKeyViolationError(HTTPException):
             else 'Нарушено ограничение внешнего ключа'
         )
         super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+class InvalidCursorError(HTTPException):
+    """Исключение, выбрасываемое при некорректном курсоре пагинации."""
+
+    def __init__(self, cursor: str = None):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Некорректный курсор пагинации: {cursor}',
+        )
@@ -0,0 +1,506 @@
+from aiokafka import (
+    AIOKafkaConsumer,
+    AIOKafkaProducer,
+    ConsumerRebalanceListener,
+    TopicPartition,
+)
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Iterable, Optional
+
+from apps.core.codecs import decode_envelope, make_serializer
+from apps.core.config import settings
+from apps.core.metrics import (
+    KAFKA_CONSUME_LATENCY,
+    KAFKA_CONSUMER_LAG,
+    KAFKA_DECODE_ERRORS,
+    KAFKA_HANDLER_ERRORS,
+    KAFKA_SEND_LATENCY,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class KafkaProducer:
+    """
+    Продюсер Kafka с настройками пропускной способности из `Settings`.
+
+    `send` только ставит сообщение в батч и возвращает future подтверждения
+    доставки, поэтому сообщения не ждут друг друга. Число неподтверждённых
+    сообщений ограничено `max_in_flight`: при превышении `send` ждёт.
+    """
+
+    def __init__(
+        self,
+        bootstrap_servers: str = settings.KAFKA_BOOTSTRAP_SERVERS,
+        max_in_flight: int = settings.KAFKA_MAX_IN_FLIGHT,
+    ):
+        self.bootstrap_servers = bootstrap_servers
+        self.producer = None
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def start(self):
+        self.producer = AIOKafkaProducer(
+            bootstrap_servers=self.bootstrap_servers,
+            value_serializer=make_serializer(
+                settings.KAFKA_CODEC, settings.KAFKA_ENVELOPE
+            ),
+            key_serializer=lambda k: str(k).encode('utf-8') if k is not None else None,
+            acks='all' if settings.KAFKA_ACKS == 'all' else int(settings.KAFKA_ACKS),
+            linger_ms=settings.KAFKA_LINGER_MS,
+            max_batch_size=settings.KAFKA_MAX_BATCH_SIZE,
+            compression_type=settings.KAFKA_COMPRESSION_TYPE,
+        )
+        await self.producer.start()
+
+    async def stop(self):
+        if self.producer:
+            await self.producer.stop()
+
+    async def send(
+        self, topic: str, message: dict, key: Optional[Any] = None
+    ) -> asyncio.Future:
+        """Ставит сообщение в очередь отправки и возвращает future доставки."""
+
+        if not self.producer:
+            raise Exception("Producer not started")
+        await self._in_flight.acquire()
+        start = time.perf_counter()
+        try:
+            future = await self.producer.send(topic, message, key=key)
+        except BaseException:
+            self._in_flight.release()
+            raise
+        future.add_done_callback(partial(self._on_delivered, topic, start))
+        return future
+
+    async def send_many(
+        self,
+        topic: str,
+        messages: Iterable[dict],
+        keys: Optional[Iterable[Any]] = None,
+        wait: bool = True,
+    ) -> list[asyncio.Future]:
+        """
+        Отправляет пачку сообщений, не дожидаясь каждого по отдельности.
+
+        При `wait=True` возвращает управление после подтверждения всей пачки.
+        """
+
+        messages = list(messages)
+        keys = list(keys) if keys is not None else [None] * len(messages)
+        futures = [
+            await self.send(topic, message, key=key)
+            for message, key in zip(messages, keys)
+        ]
+        if wait:
+            await asyncio.gather(*futures)
+        return futures
+
+    async def send_message(self, topic: str, message: dict, key: Optional[Any] = None):
+        await self.send(topic, message, key=key)
+
+    def _on_delivered(self, topic: str, start: float, future: asyncio.Future):
+        self._in_flight.release()
+        if not future.cancelled() and future.exception() is not None:
+            logger.error('Kafka delivery failed: %s', future.exception())
+            return
+        KAFKA_SEND_LATENCY.labels(topic).observe(time.perf_counter() - start)
+
+
+class _RebalanceListener(ConsumerRebalanceListener):
+    def __init__(self, consumer: 'KafkaConsumer'):
+        self._consumer = consumer
+
+    async def on_partitions_revoked(self, revoked):
+        await self._consumer.release_partitions(revoked)
+
+    async def on_partitions_assigned(self, assigned):
+        self._consumer.reset_partitions(assigned)
+
+
+class KafkaConsumer:
+    """
+    Консьюмер Kafka с параллельной обработкой и ручными коммитами.
+
+    Сообщения раскладываются по `concurrency` очередям-воркерам по ключу
+    (или по партиции, если ключа нет), поэтому сообщения с одним ключом
+    обрабатываются строго по порядку, а с разными - параллельно. Одновременно
+    в обработке не больше `max_in_flight` сообщений. Оффсет партиции
+    коммитится раз в `commit_interval` секунд и только до первого ещё не
+    обработанного сообщения. Сообщение, не обработанное после всех повторов,
+    уходит в `dead_letter_topic` и считается обработанным; без такого топика
+    его оффсет не коммитится (см. `KAFKA_DEAD_LETTER_TOPIC`).
+
+    В пакетном режиме (`batch_handler`) сообщения читаются через `getmany`,
+    обработчик получает список значений одной партиции, а оффсеты коммитятся
+    сразу после обработки выборки - только для успешно обработанных пачек.
+    Неудачная пачка уходит в `dead_letter_topic`; без него коммиты её партиции
+    останавливаются до ребаланса или перезапуска. При отзыве партиции ребаланс
+    ждёт её текущую пачку, а оффсеты уже не назначенных партиций не коммитятся.
+    """
+
+    def __init__(
+        self,
+        bootstrap_servers: str = settings.KAFKA_BOOTSTRAP_SERVERS,
+        group_id: Optional[str] = "app2-group",
+        auto_offset_reset: str = 'earliest',
+        concurrency: int = settings.KAFKA_CONSUMER_CONCURRENCY,
+        max_in_flight: int = settings.KAFKA_CONSUMER_MAX_IN_FLIGHT,
+        commit_interval: float = settings.KAFKA_COMMIT_INTERVAL,
+        batch_max_records: int = settings.KAFKA_BATCH_MAX_RECORDS,
+        batch_timeout_ms: int = settings.KAFKA_BATCH_TIMEOUT_MS,
+        dead_letter_topic: Optional[str] = settings.KAFKA_DEAD_LETTER_TOPIC,
+        dead_letter_producer: Optional[KafkaProducer] = None,
+    ):
+        self.bootstrap_servers = bootstrap_servers
+        # group_id=None - читать все партиции без группы (fan-out на каждый узел)
+        self.group_id = group_id
+        self.auto_offset_reset = auto_offset_reset
+        self.concurrency = concurrency
+        self.commit_interval = commit_interval
+        self.batch_max_records = batch_max_records
+        self.batch_timeout_ms = batch_timeout_ms
+        self.dead_letter_topic = dead_letter_topic
+        self._dead_letter_producer = dead_letter_producer
+        self._own_dead_letter_producer = False
+        self.consumer = None
+        self.message_handler = None
+        self.batch_handler = None
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._lanes: list[asyncio.Queue] = []
+        self._tasks: list[asyncio.Task] = []
+        # partition -> {offset -> None (в обработке) | True (успех) | False (ошибка)},
+        # в порядке получения
+        self._pending: dict[TopicPartition, OrderedDict[int, Optional[bool]]] = {}
+        # partition -> следующий оффсет для коммита
+        self._committable: dict[TopicPartition, int] = {}
+        self._committed: dict[TopicPartition, int] = {}
+        # Партиции с неудачной пачкой: их оффсеты больше не коммитятся
+        self._blocked: set[TopicPartition] = set()
+        # partition -> задача обработки её текущей пачки
+        self._batches: dict[TopicPartition, asyncio.Task] = {}
+        self._progress = asyncio.Condition()
+
+    async def start(
+        self,
+        topics: list,
+        message_handler: Optional[Callable] = None,
+        batch_handler: Optional[Callable] = None,
+    ):
+        self.message_handler = message_handler
+        self.batch_handler = batch_handler
+        self.consumer = AIOKafkaConsumer(
+            bootstrap_servers=self.bootstrap_servers,
+            group_id=self.group_id,
+            auto_offset_reset=self.auto_offset_reset,
+            enable_auto_commit=False,
+        )
+        self.consumer.subscribe(topics=topics, listener=_RebalanceListener(self))
+        await self.consumer.start()
+        if self.dead_letter_topic and self._dead_letter_producer is None:
+            self._dead_letter_producer = KafkaProducer(self.bootstrap_servers)
+            self._own_dead_letter_producer = True
+            await self._dead_letter_producer.start()
+
+        if self.batch_handler:
+            self._lanes = []
+            self._tasks = [asyncio.create_task(self.consume_batches())]
+            return
+        self._lanes = [asyncio.Queue() for _ in range(self.concurrency)]
+        self._tasks = [asyncio.create_task(self._worker(lane)) for lane in self._lanes]
+        if self.group_id is not None:
+            self._tasks.append(asyncio.create_task(self._commit_loop()))
+        # Запускаем фоновую задачу для обработки сообщений
+        self._tasks.append(asyncio.create_task(self.consume()))
+
+    async def stop(self):
+        if not self.consumer:
+            return
+        # Сначала перестаём читать, затем дорабатываем уже полученное
+        self._tasks[-1].cancel()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(lane.join() for lane in self._lanes)),
+                self.commit_interval * 10,
+            )
+        except asyncio.TimeoutError:
+            logger.warning('Kafka consumer stopped with unprocessed messages')
+        await self.commit()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.consumer.stop()
+        if self._own_dead_letter_producer:
+            await self._dead_letter_producer.stop()
+            self._dead_letter_producer = None
+            self._own_dead_letter_producer = False
+
+    async def consume(self):
+        while True:
+            try:
+                async for msg in self.consumer:
+                    tp = TopicPartition(msg.topic, msg.partition)
+                    self._record_lag(tp, msg.offset)
+                    self._pending.setdefault(tp, OrderedDict())[msg.offset] = None
+                    if not self._decode(msg):
+                        # Битую запись пропускаем, её оффсет можно коммитить
+                        await self._mark_done(tp, msg.offset, True)
+                        continue
+                    await self._in_flight.acquire()
+                    lane_key = msg.key if msg.key is not None else msg.partition
+                    self._lanes[hash(lane_key) % self.concurrency].put_nowait(msg)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Error in consumer: {e}")
+                await asyncio.sleep(settings.KAFKA_HANDLER_RETRY_BACKOFF)
+
+    async def consume_batches(self):
+        while True:
+            try:
+                batches = await self.consumer.getmany(
+                    timeout_ms=self.batch_timeout_ms,
+                    max_records=self.batch_max_records,
+                )
+                if not batches:
+                    continue
+                # Разные партиции обрабатываются параллельно, следующая выборка -
+                # только после завершения текущей, поэтому порядок в партиции сохраняется
+                tasks = {
+                    tp: asyncio.create_task(self._handle_batch(tp, records))
+                    for tp, records in batches.items()
+                }
+                self._batches.update(tasks)
+                try:
+                    # Пачку отзываемой партиции может отменить release_partitions
+                    await asyncio.gather(*tasks.values(), return_exceptions=True)
+                finally:
+                    for tp, task in tasks.items():
+                        if self._batches.get(tp) is task:
+                            del self._batches[tp]
+                try:
+                    await self.commit()
+                except Exception:
+                    # Например, партицию отозвали во время обработки пачки
+                    logger.exception('Kafka offset commit failed')
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Error in consumer: {e}")
+                await asyncio.sleep(settings.KAFKA_HANDLER_RETRY_BACKOFF)
+
+    def _decode(self, msg) -> bool:
+        """Декодирует значение записи на месте; False - запись нужно пропустить."""
+
+        try:
+            msg.value = decode_envelope(msg.value)
+            return True
+        except Exception as e:
+            KAFKA_DECODE_ERRORS.labels(msg.topic).inc()
+            logger.warning(
+                'Skipping undecodable %s[%s]@%s: %s',
+                msg.topic, msg.partition, msg.offset, e,
+            )
+            return False
+
+    async def _handle_batch(self, tp: TopicPartition, records: list):
+        """Обрабатывает пачку и отмечает её оффсеты для коммита."""
+
+        succeeded = await self._process_batch(tp, records)
+        self._record_lag(tp, records[-1].offset)
+        if not succeeded and tp not in self._blocked:
+            self._blocked.add(tp)
+            logger.warning(
+                'Commits of %s[%s] stop at offset %s',
+                tp.topic, tp.partition, records[0].offset,
+            )
+        if tp not in self._blocked:
+            self._committable[tp] = records[-1].offset + 1
+
+    async def _process_batch(self, tp: TopicPartition, records: list) -> bool:
+        """Обрабатывает пачку с повторами; False - её оффсеты коммитить нельзя."""
+
+        # Битые записи пропускаем, остальные передаём обработчику
+        records = [record for record in records if self._decode(record)]
+        if not records:
+            return True
+        values = [record.value for record in records]
+        offsets = [record.offset for record in records]
+        for attempt in range(settings.KAFKA_HANDLER_MAX_RETRIES + 1):
+            start = time.perf_counter()
+            try:
+                await self.batch_handler(values, tp.topic, tp.partition, offsets)
+                KAFKA_CONSUME_LATENCY.labels(tp.topic).observe(time.perf_counter() - start)
+                return True
+            except Exception as e:
+                if attempt == settings.KAFKA_HANDLER_MAX_RETRIES:
+                    KAFKA_HANDLER_ERRORS.labels(tp.topic).inc(len(records))
+                    logger.exception(
+                        'Failed batch %s[%s]@%s-%s after %s retries',
+                        tp.topic, tp.partition, offsets[0], offsets[-1], attempt,
+                    )
+                    for record in records:
+                        if not await self._dead_letter(record, e):
+                            return False
+                    return True
+                await asyncio.sleep(settings.KAFKA_HANDLER_RETRY_BACKOFF * 2 ** attempt)
+        return False
+
+    def _record_lag(self, tp: TopicPartition, offset: int):
+        highwater = self.consumer.highwater(tp)
+        if highwater is not None:
+            KAFKA_CONSUMER_LAG.labels(tp.topic, tp.partition).set(highwater - offset - 1)
+
+    async def _worker(self, lane: asyncio.Queue):
+        while True:
+            msg = await lane.get()
+            succeeded = False
+            try:
+                succeeded = await self._process(msg)
+            finally:
+                await self._mark_done(
+                    TopicPartition(msg.topic, msg.partition), msg.offset, succeeded
+                )
+                self._in_flight.release()
+                lane.task_done()
+
+    async def _process(self, msg) -> bool:
+        """Обрабатывает сообщение с повторами; False - его оффсет коммитить нельзя."""
+
+        if not self.message_handler:
+            return True
+        for attempt in range(settings.KAFKA_HANDLER_MAX_RETRIES + 1):
+            start = time.perf_counter()
+            try:
+                await self.message_handler(msg.value, msg.topic, msg.partition, msg.offset)
+                KAFKA_CONSUME_LATENCY.labels(msg.topic).observe(time.perf_counter() - start)
+                return True
+            except Exception as e:
+                if attempt == settings.KAFKA_HANDLER_MAX_RETRIES:
+                    KAFKA_HANDLER_ERRORS.labels(msg.topic).inc()
+                    logger.exception(
+                        'Failed %s[%s]@%s after %s retries',
+                        msg.topic, msg.partition, msg.offset, attempt,
+                    )
+                    return await self._dead_letter(msg, e)
+                await asyncio.sleep(settings.KAFKA_HANDLER_RETRY_BACKOFF * 2 ** attempt)
+        return False
+
+    async def _dead_letter(self, msg, error: Exception) -> bool:
+        """Отправляет сообщение в dead-letter топик и ждёт подтверждения доставки."""
+
+        if not self.dead_letter_topic or self._dead_letter_producer is None:
+            logger.warning(
+                'No dead-letter topic, commits of %s[%s] stop at offset %s',
+                msg.topic, msg.partition, msg.offset,
+            )
+            return False
+        try:
+            future = await self._dead_letter_producer.send(
+                self.dead_letter_topic,
+                {
+                    'topic': msg.topic,
+                    'partition': msg.partition,
+                    'offset': msg.offset,
+                    'value': msg.value,
+                    'error': repr(error),
+                },
+                key=msg.key.decode('utf-8', 'replace') if msg.key is not None else None,
+            )
+            await future
+            return True
+        except Exception:
+            logger.exception(
+                'Dead-letter delivery of %s[%s]@%s failed',
+                msg.topic, msg.partition, msg.offset,
+            )
+            return False
+
+    async def _mark_done(self, tp: TopicPartition, offset: int, succeeded: bool):
+        pending = self._pending.get(tp)
+        if pending is None or offset not in pending:
+            return
+        pending[offset] = succeeded
+        # Коммитить можно только непрерывный префикс успешно обработанных оффсетов
+        while pending:
+            first_offset, done = next(iter(pending.items()))
+            if done is not True:
+                break
+            pending.popitem(last=False)
+            self._committable[tp] = first_offset + 1
+        async with self._progress:
+            self._progress.notify_all()
+
+    async def _commit_loop(self):
+        while True:
+            await asyncio.sleep(self.commit_interval)
+            try:
+                await self.commit()
+            except Exception:
+                logger.exception('Kafka offset commit failed')
+
+    async def commit(self, partitions: Optional[set[TopicPartition]] = None):
+        if self.group_id is None:
+            return
+        # Оффсеты отозванных партиций коммитить нельзя: aiokafka отклонит весь коммит
+        assigned = self.consumer.assignment()
+        for tp in set(self._committable) - assigned:
+            self._committable.pop(tp, None)
+            self._committed.pop(tp, None)
+        offsets = {
+            tp: offset
+            for tp, offset in self._committable.items()
+            if self._committed.get(tp) != offset
+            and (partitions is None or tp in partitions)
+        }
+        if offsets:
+            await self.consumer.commit(offsets)
+            self._committed.update(offsets)
+
+    async def release_partitions(self, revoked):
+        """Дорабатывает сообщения отзываемых партиций и коммитит их оффсеты."""
+
+        revoked = set(revoked)
+        batches = [self._batches[tp] for tp in revoked if tp in self._batches]
+        try:
+            async with self._progress:
+                await asyncio.wait_for(
+                    self._progress.wait_for(lambda: not self._in_progress(revoked)),
+                    self.commit_interval * 10,
+                )
+            if batches:
+                await asyncio.wait_for(
+                    asyncio.shield(asyncio.gather(*batches, return_exceptions=True)),
+                    self.commit_interval * 10,
+                )
+        except asyncio.TimeoutError:
+            logger.warning('Revoking partitions with unprocessed messages: %s', revoked)
+            # Недоработанные пачки отменяем: их оффсеты не закоммичены, и новый
+            # владелец партиции прочитает их заново
+            for task in batches:
+                task.cancel()
+        try:
+            await self.commit(revoked)
+        except Exception:
+            logger.exception('Kafka offset commit on revoke failed')
+        self.reset_partitions(revoked)
+
+    def _in_progress(self, partitions: set[TopicPartition]) -> bool:
+        return any(
+            state is None
+            for tp in partitions
+            for state in self._pending.get(tp, {}).values()
+        )
+
+    def reset_partitions(self, partitions):
+        for tp in partitions:
+            self._pending.pop(tp, None)
+            self._committable.pop(tp, None)
+            self._committed.pop(tp, None)
+            self._blocked.discard(tp)
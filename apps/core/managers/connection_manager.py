@@ -1,32 +1,218 @@
+import asyncio
+import logging
+import time
+from enum import Enum
+from typing import Any, Dict, Iterable, Optional
+
 from fastapi import WebSocket
-from typing import Dict
+from starlette import status
+
+from apps.core.codecs import json_dumpb, json_dumps
+from apps.core.config import settings
+from apps.core.metrics import BROADCAST_DURATION, BROADCAST_RECIPIENTS, WS_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(str, Enum):
+    drop_oldest = "drop_oldest"
+    drop_newest = "drop_newest"
+    disconnect = "disconnect"
+
+
+class FrameFormat(str, Enum):
+    text = "text"
+    binary = "binary"
+
+
+class Connection:
+    """Сокет с собственной очередью исходящих сообщений и задачей-писателем."""
+
+    __slots__ = ('chat_id', 'user_id', 'websocket', 'queue', 'task')
+
+    def __init__(self, chat_id: int, user_id: str, websocket: WebSocket, queue_size: int):
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
 
 
 class ConnectionManager:
-    def __init__(self):
-        # chat_id -> {user_id -> websocket}
-        self.active_connections: Dict[int, Dict[str, WebSocket]] = {}
+    """
+    Реестр websocket-соединений узла.
+
+    У пользователя может быть несколько соединений в одном чате (вкладки,
+    устройства). Помимо индекса по чатам ведётся обратный индекс по
+    пользователям, поэтому поиск, рассылка и отключение всех соединений
+    пользователя не требуют обхода чатов.
+    """
 
-    async def connect(self, chat_id: int, user_id: str, websocket: WebSocket):
+    def __init__(
+        self,
+        queue_size: int = settings.WS_SEND_QUEUE_SIZE,
+        overflow_policy: OverflowPolicy = OverflowPolicy(settings.WS_OVERFLOW_POLICY),
+        frame_format: FrameFormat = FrameFormat(settings.WS_FRAME_FORMAT),
+    ):
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.frame_format = frame_format
+        # chat_id -> {user_id -> {connection}}
+        self.active_connections: Dict[int, Dict[str, set[Connection]]] = {}
+        # user_id -> {connection}
+        self.user_connections: Dict[str, set[Connection]] = {}
+        self._closing: set[asyncio.Task] = set()
+
+    async def connect(self, chat_id: int, user_id: str, websocket: WebSocket) -> Connection:
         await websocket.accept()
+        connection = Connection(chat_id, user_id, websocket, self.queue_size)
+        connection.task = asyncio.create_task(self._writer(connection))
+        self.active_connections.setdefault(chat_id, {}).setdefault(user_id, set()).add(
+            connection
+        )
+        self.user_connections.setdefault(user_id, set()).add(connection)
+        WS_CONNECTIONS.inc()
+        return connection
+
+    def disconnect(self, connection: Connection):
+        self._stop_writer(connection)
+        chat_connections = self.active_connections.get(connection.chat_id)
+        if chat_connections is not None:
+            sockets = chat_connections.get(connection.user_id)
+            if sockets is not None:
+                sockets.discard(connection)
+                if not sockets:
+                    del chat_connections[connection.user_id]
+            if not chat_connections:
+                del self.active_connections[connection.chat_id]
+        sockets = self.user_connections.get(connection.user_id)
+        if sockets is not None and connection in sockets:
+            sockets.remove(connection)
+            WS_CONNECTIONS.dec()
+            if not sockets:
+                del self.user_connections[connection.user_id]
+
+    def disconnect_user(self, user_id: str, code: int = status.WS_1000_NORMAL_CLOSURE):
+        """Закрывает все соединения пользователя на этом узле."""
+
+        for connection in list(self.user_connections.get(user_id, ())):
+            self.disconnect(connection)
+            self._schedule_close(connection.websocket, code)
+
+    def is_online(self, user_id: str) -> bool:
+        return user_id in self.user_connections
+
+    def is_user_in_chat(self, chat_id: int, user_id: str) -> bool:
+        return user_id in self.active_connections.get(chat_id, {})
+
+    async def broadcast(
+        self,
+        chat_id: int,
+        message: Any,
+        exclude_user: str = None,
+        exclude: Optional[Connection] = None,
+    ):
+        """
+        Ставит сообщение в очереди всех участников чата, не дожидаясь отправки.
+
+        Медленный клиент не задерживает остальных: при переполнении его очереди
+        применяется `overflow_policy`. Сообщение сериализуется один раз, и всем
+        получателям уходит один и тот же готовый фрейм. `exclude_user` исключает
+        все соединения пользователя, `exclude` - одно соединение (отправителя).
+        """
+
         if chat_id not in self.active_connections:
-            self.active_connections[chat_id] = {}
-        self.active_connections[chat_id][user_id] = websocket
-
-    def disconnect(self, chat_id: int, user_id: str):
-        if chat_id in self.active_connections:
-            self.active_connections[chat_id].pop(user_id, None)
-            if not self.active_connections[chat_id]:
-                del self.active_connections[chat_id]
-
-    async def broadcast(self, chat_id: int, message: dict, exclude_user: str = None):
-        if chat_id in self.active_connections:
-            for user_id, connection in self.active_connections[chat_id].items():
-                if exclude_user and user_id == exclude_user:
-                    continue
-                try:
-                    await connection.send_json(message)
-                except:
-                    pass  # Connection dead, will be cleaned up on next disconnect
+            return
+        start = time.perf_counter()
+        frame = self.encode(message)
+        recipients = 0
+        for user_id, sockets in list(self.active_connections[chat_id].items()):
+            if exclude_user and user_id == exclude_user:
+                continue
+            recipients += self._enqueue_all(sockets, frame, exclude)
+        BROADCAST_DURATION.observe(time.perf_counter() - start)
+        BROADCAST_RECIPIENTS.observe(recipients)
+
+    async def send_to_user(self, user_id: str, message: Any):
+        """Отправляет сообщение на все устройства пользователя."""
+
+        sockets = self.user_connections.get(user_id)
+        if sockets:
+            self._enqueue_all(sockets, self.encode(message))
+
+    async def send(self, connection: Connection, message: Any):
+        """Отправляет сообщение в одно соединение через его очередь."""
+
+        self._enqueue(connection, self.encode(message))
+
+    def encode(self, message: Any) -> str | bytes:
+        if self.frame_format == FrameFormat.binary:
+            return json_dumpb(message)
+        return json_dumps(message)
+
+    def _enqueue_all(
+        self,
+        sockets: Iterable[Connection],
+        frame: str | bytes,
+        exclude: Optional[Connection] = None,
+    ) -> int:
+        recipients = 0
+        for connection in list(sockets):
+            if connection is not exclude:
+                self._enqueue(connection, frame)
+                recipients += 1
+        return recipients
+
+    def _enqueue(self, connection: Connection, frame: str | bytes):
+        try:
+            connection.queue.put_nowait(frame)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.overflow_policy == OverflowPolicy.drop_newest:
+            return
+        if self.overflow_policy == OverflowPolicy.drop_oldest:
+            connection.queue.get_nowait()
+            connection.queue.put_nowait(frame)
+            return
+
+        logger.warning(
+            'Outbound queue overflow for user %s in chat %s, disconnecting',
+            connection.user_id, connection.chat_id,
+        )
+        self.disconnect(connection)
+        self._schedule_close(connection.websocket, status.WS_1013_TRY_AGAIN_LATER)
+
+    async def _writer(self, connection: Connection):
+        while True:
+            frame = await connection.queue.get()
+            try:
+                if isinstance(frame, bytes):
+                    await connection.websocket.send_bytes(frame)
+                else:
+                    await connection.websocket.send_text(frame)
+            except Exception:
+                # Сокет мёртв: сразу убираем его из реестра
+                self.disconnect(connection)
+                return
+
+    @staticmethod
+    def _stop_writer(connection: Connection):
+        if connection.task is not None and connection.task is not asyncio.current_task():
+            connection.task.cancel()
+
+    def _schedule_close(self, websocket: WebSocket, code: int):
+        task = asyncio.create_task(self._close(websocket, code))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+
 
 connection_manager = ConnectionManager()
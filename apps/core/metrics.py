@@ -0,0 +1,156 @@
+import os
+import time
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Бакеты для быстрых операций (БД, Kafka, рассылка) - от 0.5 мс до 2.5 с
+FAST_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+HTTP_REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Длительность обработки HTTP-запроса',
+    ['method', 'route', 'status'],
+)
+WS_CONNECTIONS = Gauge(
+    'websocket_connections',
+    'Активные websocket-соединения на узле',
+    multiprocess_mode='livesum',
+)
+BROADCAST_DURATION = Histogram(
+    'broadcast_duration_seconds',
+    'Длительность постановки сообщения в очереди получателей',
+    buckets=FAST_BUCKETS,
+)
+BROADCAST_RECIPIENTS = Histogram(
+    'broadcast_recipients',
+    'Количество получателей одной рассылки',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+DB_FLUSH_LATENCY = Histogram(
+    'db_flush_duration_seconds',
+    'Длительность flush сессии в репозитории',
+    ['model'],
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Время ожидания соединения из пула',
+    ['engine'],
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_EXHAUSTED = Counter(
+    'db_pool_exhausted_total',
+    'Запросы соединения, заставшие пул полностью занятым',
+    ['engine'],
+)
+DB_POOL_TIMEOUTS = Counter(
+    'db_pool_timeouts_total',
+    'Запросы соединения, не дождавшиеся его за pool_timeout',
+    ['engine'],
+)
+DB_POOL_IN_USE = Gauge(
+    'db_pool_connections_in_use',
+    'Соединения, выданные из пула',
+    ['engine'],
+    multiprocess_mode='livesum',
+)
+KAFKA_SEND_LATENCY = Histogram(
+    'kafka_send_duration_seconds',
+    'Время от отправки сообщения до подтверждения брокером',
+    ['topic'],
+    buckets=FAST_BUCKETS,
+)
+KAFKA_CONSUME_LATENCY = Histogram(
+    'kafka_consume_duration_seconds',
+    'Длительность обработки сообщения или пачки консьюмером',
+    ['topic'],
+    buckets=FAST_BUCKETS,
+)
+KAFKA_CONSUMER_LAG = Gauge(
+    'kafka_consumer_lag',
+    'Отставание консьюмера от конца партиции',
+    ['topic', 'partition'],
+    multiprocess_mode='max',
+)
+KAFKA_HANDLER_ERRORS = Counter(
+    'kafka_handler_errors_total',
+    'Сообщения, не обработанные после исчерпания повторов',
+    ['topic'],
+)
+KAFKA_DECODE_ERRORS = Counter(
+    'kafka_decode_errors_total',
+    'Сообщения, пропущенные из-за ошибки декодирования',
+    ['topic'],
+)
+ES_REQUEST_LATENCY = Histogram(
+    'es_request_duration_seconds',
+    'Длительность запросов к Elasticsearch',
+    ['operation'],
+)
+ES_DOCUMENTS_DROPPED = Counter(
+    'es_documents_dropped_total',
+    'Документы, потерянные для индекса: не отправлены и не сохранены для дозагрузки',
+    ['index'],
+)
+ES_DOCUMENTS_SPILLED = Counter(
+    'es_documents_spilled_total',
+    'Документы, не отправленные в индекс и сохранённые на диск для дозагрузки',
+    ['index'],
+)
+
+
+class PrometheusMiddleware:
+    """ASGI-middleware, замеряющее длительность HTTP-запросов по шаблону маршрута."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Шаблон маршрута вместо пути, чтобы не плодить метки на каждый id
+            route = scope.get('route')
+            HTTP_REQUEST_LATENCY.labels(
+                scope['method'],
+                route.path if route else 'unmatched',
+                status_code,
+            ).observe(time.perf_counter() - start)
+
+
+metrics_router = APIRouter(tags=['metrics'])
+
+
+@metrics_router.get('/metrics', include_in_schema=False)
+async def metrics():
+    # При нескольких воркерах uvicorn метрики собираются из PROMETHEUS_MULTIPROC_DIR
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
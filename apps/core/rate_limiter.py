@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated_at')
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class TokenBucketLimiter:
+    """
+    Ограничитель частоты по алгоритму token bucket с отдельным ведром на ключ.
+
+    Ведро пополняется со скоростью `rate` токенов в секунду до `burst`.
+    Ведра хранятся в порядке последнего обращения, поэтому простаивающие дольше
+    `idle_ttl` секунд удаляются с начала за амортизированное O(1): полное ведро
+    без обращений эквивалентно отсутствующему.
+    """
+
+    def __init__(self, rate: float, burst: int, idle_ttl: float = 300):
+        self.rate = rate
+        self.burst = burst
+        self.idle_ttl = max(idle_ttl, burst / rate)
+        self._buckets: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: Hashable, cost: float = 1) -> float:
+        """
+        Списывает `cost` токенов.
+
+        Возвращает 0, если запрос разрешён, иначе - сколько секунд ждать
+        до появления нужного количества токенов.
+        """
+
+        now = time.monotonic()
+        self._evict_idle(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.burst, now)
+            self._buckets[key] = bucket
+        else:
+            bucket.tokens = min(
+                self.burst, bucket.tokens + (now - bucket.updated_at) * self.rate
+            )
+            bucket.updated_at = now
+            self._buckets.move_to_end(key)
+
+        if bucket.tokens >= cost:
+            bucket.tokens -= cost
+            return 0
+        return (cost - bucket.tokens) / self.rate
+
+    def refund(self, key: Hashable, cost: float = 1) -> None:
+        """Возвращает токены, списанные для запроса, который не был выполнен."""
+
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.tokens = min(self.burst, bucket.tokens + cost)
+
+    def _evict_idle(self, now: float) -> None:
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if now - bucket.updated_at < self.idle_ttl:
+                break
+            del self._buckets[key]
@@ -1,8 +1,33 @@
+import time
 from datetime import date
-from typing import Any, Generic, Optional, Sequence, Type, TypeVar
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Generic,
+    Iterable,
+    Optional,
+    Sequence,
+    Type,
+    TypeVar,
+)
 
+import asyncpg
 from pydantic import BaseModel as BaseSchema
-from sqlalchemy import BinaryExpression, Select, and_, delete, select, update
+from sqlalchemy import (
+    BinaryExpression,
+    Select,
+    UniqueConstraint,
+    and_,
+    column,
+    delete,
+    func,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Result
 from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -11,28 +36,41 @@ from apps.core.exeptions import (
     ObjectDoesntExist,
     UniqueViolationError,
 )
+from apps.core.metrics import DB_FLUSH_LATENCY
 from apps.core.models import BaseDBModel
 
+# Ограничение asyncpg на число параметров в одном запросе
+MAX_QUERY_PARAMS = 32767
+
 T = TypeVar('T', bound=BaseDBModel)
 C = TypeVar('C', bound=BaseSchema)
 U = TypeVar('U', bound=BaseSchema)
 
 
 class BaseRepository(Generic[T, C, U]):
-    """Базовый класс репозитория."""
+    """
+    Базовый класс репозитория.
+
+    Чистые чтения (`get_by_pk`, `get_all`, `iter_*`) идут через `read_session`,
+    например сессию реплики. Запись и чтения внутри операций записи всегда
+    используют основную `session`. Без `read_session` всё идёт в основную БД.
+    """
 
     model: Type[T]
     pk_name: str = 'id'
 
-    def __init__(self, session: AsyncSession) -> None:
+    def __init__(
+        self, session: AsyncSession, read_session: Optional[AsyncSession] = None
+    ) -> None:
         self.session = session
+        self.read_session = read_session or session
 
     @staticmethod
     def _extract_unique_field_from_error(orig_error: Any) -> Optional[str]:
         """
         Извлекает имя поля, нарушившего уникальное ограничение, из сообщения ошибки.
         """
-        detail: str = getattr(orig_error, 'detail', str(orig_error))
+        detail: str = getattr(orig_error, 'detail', None) or str(orig_error)
         if 'Key (' in detail:
             return detail.split('Key (')[1].split(')=')[0]
         return None
@@ -43,7 +81,7 @@ class BaseRepository(Generic[T, C, U]):
         Извлекает имя поля, связанного с нарушением внешнего ключа, из сообщения ошибки.
         """
 
-        detail: str = getattr(orig_error, 'detail', str(orig_error))
+        detail: str = getattr(orig_error, 'detail', None) or str(orig_error)
         if 'Key (' in detail:
             return detail.split('Key (')[1].split(')=')[0]
         return None
@@ -79,9 +117,22 @@ class BaseRepository(Generic[T, C, U]):
 
         raise error
 
+    async def _execute_or_handle_error(self, stmt) -> Result:
+        """Выполняет запрос; при ошибке БД откатывает транзакцию сессии."""
+
+        try:
+            return await self.session.execute(stmt)
+        except IntegrityError as e:
+            await self.session.rollback()
+            self._handle_integrity_error(e)
+        except DBAPIError:
+            await self.session.rollback()
+            raise
+
     async def _save_or_handle_error(self) -> None:
         """Фиксирует транзакцию или обрабатывает возможные ошибки БД."""
 
+        start = time.perf_counter()
         try:
             await self.session.flush()
         except IntegrityError as e:
@@ -90,6 +141,10 @@ class BaseRepository(Generic[T, C, U]):
         except DBAPIError:
             await self.session.rollback()
             raise
+        finally:
+            DB_FLUSH_LATENCY.labels(self.model.__name__).observe(
+                time.perf_counter() - start
+            )
 
     @property
     def _base_query(self) -> Select:
@@ -116,8 +171,11 @@ class BaseRepository(Generic[T, C, U]):
     async def get_by_pk(self, model_pk: int | str) -> Optional[T]:
         """Получение объекта по его id."""
 
-        stmt = self._base_query.where(self.model.id == model_pk)
-        existed_object = await self.session.scalar(stmt)
+        return await self._get_by_pk(self.read_session, model_pk)
+
+    async def _get_by_pk(self, session: AsyncSession, model_pk: int | str) -> T:
+        stmt = self._base_query.where(self.pk_column == model_pk)
+        existed_object = await session.scalar(stmt)
         if not existed_object:
             raise ObjectDoesntExist(self.model.__name__)
         return existed_object
@@ -129,9 +187,35 @@ class BaseRepository(Generic[T, C, U]):
         filters = self._filter_params(**kwargs)
         if filters:
             stmt = stmt.where(and_(*filters))
-        result = await self.session.execute(stmt)
+        result = await self.read_session.execute(stmt)
         return result.unique().scalars().all()
 
+    async def iter_batches(
+        self, batch_size: int = 1000, **kwargs
+    ) -> AsyncIterator[Sequence[T]]:
+        """
+        Потоково отдаёт объекты пачками по `batch_size` через серверный курсор.
+
+        В памяти одновременно находится только одна пачка, поэтому метод подходит
+        для выгрузок и фоновых задач по большим таблицам. Порядок - по первичному ключу.
+        """
+
+        stmt = self._base_query.order_by(self.pk_column)
+        filters = self._filter_params(**kwargs)
+        if filters:
+            stmt = stmt.where(and_(*filters))
+        stmt = stmt.execution_options(yield_per=batch_size)
+        result = await self.read_session.stream(stmt)
+        async for batch in result.scalars().partitions():
+            yield batch
+
+    async def iter_all(self, batch_size: int = 1000, **kwargs) -> AsyncIterator[T]:
+        """Потоковый аналог `get_all`: отдаёт объекты по одному."""
+
+        async for batch in self.iter_batches(batch_size, **kwargs):
+            for db_obj in batch:
+                yield db_obj
+
     async def create(self, object_schema: C) -> T:
         """Создание объекта по его схеме."""
 
@@ -151,6 +235,146 @@ class BaseRepository(Generic[T, C, U]):
         await self._save_or_handle_error()
         return db_objects
 
+    async def copy_records(
+        self,
+        records: Iterable[C | tuple] | AsyncIterable[C | tuple],
+        columns: Optional[Sequence[str]] = None,
+    ) -> int:
+        """
+        Массовая загрузка строк через COPY (asyncpg `copy_records_to_table`).
+
+        Строки передаются потоком на соединении текущей сессии и транзакции,
+        минуя ORM, поэтому объекты не создаются и в сессию не попадают.
+        `records` - обычный или асинхронный итерируемый объект из схем или
+        кортежей. Для кортежей `columns` обязателен, для схем по умолчанию берутся
+        поля первой схемы. Колонки, которых нет в `columns`, получают значения
+        по умолчанию из БД. Возвращает число загруженных строк.
+        """
+
+        if isinstance(records, AsyncIterable):
+            rows = aiter(records)
+            first = await anext(rows, None)
+        else:
+            rows = iter(records)
+            first = next(rows, None)
+        if first is None:
+            return 0
+        if columns is None:
+            if not isinstance(first, BaseSchema):
+                raise ValueError('columns are required when copying tuples')
+            columns = list(first.model_dump().keys())
+
+        def to_tuple(record: C | tuple) -> tuple:
+            if isinstance(record, BaseSchema):
+                data = record.model_dump()
+                return tuple(data[column] for column in columns)
+            return tuple(record)
+
+        if isinstance(rows, AsyncIterator):
+            async def source():
+                yield to_tuple(first)
+                async for record in rows:
+                    yield to_tuple(record)
+        else:
+            def source():
+                yield to_tuple(first)
+                for record in rows:
+                    yield to_tuple(record)
+
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        if not raw_connection.driver_connection.is_in_transaction():
+            # Адаптер asyncpg открывает транзакцию лениво, на первом запросе через
+            # курсор; без этого COPY выполнится в автокоммите и не откатится
+            await self.session.execute(select(1))
+        start = time.perf_counter()
+        try:
+            status = await raw_connection.driver_connection.copy_records_to_table(
+                self.model.__table__.name,
+                records=source(),
+                columns=list(columns),
+                schema_name=self.model.__table__.schema,
+            )
+        except asyncpg.IntegrityConstraintViolationError as e:
+            await self.session.rollback()
+            self._handle_integrity_error(IntegrityError('COPY', None, e))
+        except asyncpg.PostgresError:
+            await self.session.rollback()
+            raise
+        finally:
+            DB_FLUSH_LATENCY.labels(self.model.__name__).observe(
+                time.perf_counter() - start
+            )
+        # Статус вида 'COPY <n>'
+        return int(status.split()[-1])
+
+    async def bulk_upsert(
+        self,
+        schema_list: Sequence[C],
+        conflict_columns: Sequence[str],
+        update_columns: Optional[Sequence[str]] = None,
+        returning: bool = False,
+        chunk_size: Optional[int] = None,
+    ) -> list[T] | int:
+        """
+        Вставка или обновление объектов через INSERT ... ON CONFLICT.
+
+        Схемы вставляются пачками multi-row VALUES по `chunk_size` строк
+        (по умолчанию - сколько позволяет лимит параметров). При конфликте по
+        `conflict_columns` обновляются `update_columns`: по умолчанию все
+        переданные поля, кроме ключевых; пустой список - DO NOTHING. Дубликаты
+        ключа внутри пачки схлопываются, побеждает последняя схема.
+        С `returning=True` возвращает вставленные и обновлённые объекты,
+        иначе - число затронутых строк.
+
+        `conflict_columns` должны совпадать с первичным ключом или уникальным
+        ограничением таблицы: например, ['id'] для Chat, ['email'] для User и
+        ['id', 'created_at'] для партиционированной Message.
+        """
+
+        if set(conflict_columns) not in self._unique_keys:
+            raise ValueError(
+                f'{self.model.__tablename__} has no primary key or unique '
+                f'constraint on {list(conflict_columns)}'
+            )
+        rows = [schema.model_dump(serialize_as_any=True) for schema in schema_list]
+        if not rows:
+            return [] if returning else 0
+        columns = list(rows[0].keys())
+        missing = [c for c in conflict_columns if c not in columns]
+        if missing:
+            raise ValueError(
+                f'Conflict columns {missing} are missing from {type(schema_list[0]).__name__}'
+            )
+        if update_columns is None:
+            update_columns = [c for c in columns if c not in conflict_columns]
+        chunk_size = chunk_size or max(1, MAX_QUERY_PARAMS // len(columns))
+
+        result_objects: list[T] = []
+        affected = 0
+        for i in range(0, len(rows), chunk_size):
+            chunk = {
+                tuple(row[c] for c in conflict_columns): row
+                for row in rows[i:i + chunk_size]
+            }
+            stmt = pg_insert(self.model).values(list(chunk.values()))
+            if update_columns:
+                set_ = {c: stmt.excluded[c] for c in update_columns}
+                if hasattr(self.model, 'modified_at'):
+                    set_.setdefault('modified_at', func.now())
+                stmt = stmt.on_conflict_do_update(index_elements=conflict_columns, set_=set_)
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+            if returning:
+                stmt = stmt.returning(self.model).execution_options(
+                    populate_existing=True
+                )
+                result = await self._execute_or_handle_error(stmt)
+                result_objects.extend(result.scalars().all())
+            else:
+                affected += (await self._execute_or_handle_error(stmt)).rowcount
+        return result_objects if returning else affected
+
     async def bulk_update(self, schema_obj: U, **kwargs):
         stmt = update(self.model)
         filters = self._filter_params(**kwargs)
@@ -160,6 +384,59 @@ class BaseRepository(Generic[T, C, U]):
         await self.session.execute(stmt)
         await self._save_or_handle_error()
 
+    @property
+    def _unique_keys(self) -> list[set[str]]:
+        """Наборы колонок первичного ключа и уникальных ограничений таблицы."""
+
+        table = self.model.__table__
+        keys = [{c.name for c in table.primary_key.columns}]
+        keys += [
+            {c.name for c in constraint.columns}
+            for constraint in table.constraints
+            if isinstance(constraint, UniqueConstraint)
+        ]
+        keys += [{c.name for c in index.columns} for index in table.indexes if index.unique]
+        return keys
+
+    async def bulk_update_many(
+        self,
+        items: Sequence[tuple[int | str, U]],
+        chunk_size: Optional[int] = None,
+    ) -> int:
+        """
+        Обновление множества объектов своими значениями через UPDATE ... FROM VALUES.
+
+        `items` - пары (значение `pk_name`, частичная схема); обновляются только
+        явно заданные поля схемы. Пары с одинаковым набором полей объединяются
+        в запросы по `chunk_size` строк. Возвращает число обновлённых строк.
+        """
+
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for object_pk, schema_obj in items:
+            data = schema_obj.model_dump(serialize_as_any=True, exclude_unset=True)
+            if data:
+                data[self.pk_name] = object_pk
+                groups.setdefault(tuple(sorted(data)), []).append(data)
+
+        table_columns = self.model.__table__.c
+        updated = 0
+        for fields, rows in groups.items():
+            update_fields = [f for f in fields if f != self.pk_name]
+            size = chunk_size or max(1, MAX_QUERY_PARAMS // len(fields))
+            for i in range(0, len(rows), size):
+                source = values(
+                    *(column(f, table_columns[f].type) for f in fields),
+                    name='source',
+                ).data([tuple(row[f] for f in fields) for row in rows[i:i + size]])
+                stmt = (
+                    update(self.model)
+                    .where(self.pk_column == source.c[self.pk_name])
+                    .values({f: source.c[f] for f in update_fields})
+                    .execution_options(synchronize_session=False)
+                )
+                updated += (await self._execute_or_handle_error(stmt)).rowcount
+        return updated
+
     async def bulk_delete(self, **kwargs):
         stmt = delete(self.model)
         filters = self._filter_params(**kwargs)
@@ -171,7 +448,7 @@ class BaseRepository(Generic[T, C, U]):
     async def update(self, object_pk: int | str, schema_obj: U) -> T:
         """Обновить объект по ID из Pydantic-схемы."""
 
-        db_obj = await self.get_by_pk(object_pk)
+        db_obj = await self._get_by_pk(self.session, object_pk)
         data = schema_obj.model_dump(serialize_as_any=True, exclude_unset=True)
         for key, value in data.items():
             setattr(db_obj, key, value)
@@ -181,6 +458,6 @@ class BaseRepository(Generic[T, C, U]):
     async def delete(self, object_pk: int | str) -> None:
         """Удалить объект по ID."""
 
-        db_obj = await self.get_by_pk(object_pk)
+        db_obj = await self._get_by_pk(self.session, object_pk)
         await self.session.delete(db_obj)
         await self._save_or_handle_error()
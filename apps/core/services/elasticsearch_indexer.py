@@ -0,0 +1,261 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from apps.core.codecs import json_dumpb
+from apps.core.config import settings
+from apps.core.metrics import ES_DOCUMENTS_DROPPED, ES_DOCUMENTS_SPILLED
+from apps.core.services.elasticsearch_service import ElasticsearchService
+
+logger = logging.getLogger(__name__)
+
+# Ошибки, после которых документ имеет смысл отправить повторно
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+
+SPILL_MINUTE_FORMAT = '%Y%m%d%H%M'
+
+
+class SpillStore:
+    """
+    Документы, не отправленные в индекс, на диске для последующей дозагрузки.
+
+    Каждый процесс дописывает документы в JSONL-файл текущей минуты
+    (`<index>-<YYYYmmddHHMM>-<pid>.jsonl`). Файлы прошедших минут больше не
+    пополняются, поэтому их можно читать и удалять, не останавливая сервис.
+    """
+
+    def __init__(self, directory: str | Path, index_name: str):
+        self.directory = Path(directory)
+        self.index_name = index_name
+
+    async def write(self, entries: list[tuple[str, dict]]):
+        await asyncio.to_thread(self._write, entries)
+
+    def _write(self, entries: list[tuple[str, dict]]):
+        minute = datetime.now(timezone.utc).strftime(SPILL_MINUTE_FORMAT)
+        path = self.directory / f'{self.index_name}-{minute}-{os.getpid()}.jsonl'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'ab') as file:
+            file.write(
+                b''.join(
+                    json_dumpb({'id': doc_id, 'document': document}) + b'\n'
+                    for doc_id, document in entries
+                )
+            )
+
+    def closed_files(self, now: Optional[datetime] = None) -> list[Path]:
+        """Файлы, в которые уже никто не пишет, от старых к новым."""
+
+        now = now or datetime.now(timezone.utc)
+        # Запас в минуту на запись, начатую на границе минут
+        last_closed = (now - timedelta(minutes=1)).strftime(SPILL_MINUTE_FORMAT)
+        files = []
+        for path in self.directory.glob(f'{self.index_name}-*.jsonl'):
+            minute = path.stem[len(self.index_name) + 1:].split('-', 1)[0]
+            if minute < last_closed:
+                files.append(path)
+        return sorted(files)
+
+    @staticmethod
+    def read(path: Path) -> Iterator[tuple[str, dict]]:
+        with open(path, 'rb') as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    yield entry['id'], entry['document']
+
+
+class BulkIndexer:
+    """
+    Буферизованная индексация документов через bulk API Elasticsearch.
+
+    Документы копятся в буфере и отправляются пачкой, когда набирается
+    `max_docs` документов, `max_bytes` байт или самому старому документу
+    исполняется `max_age` секунд. Документы с временными ошибками
+    отправляются повторно с экспоненциальной задержкой. Пока в буфере и в
+    отправке больше `max_pending_bytes` байт, `add` ждёт (backpressure),
+    а `try_add_many` не ждёт и откладывает документы в `spill`. Туда же
+    попадают документы, для которых исчерпаны повторы; без `spill` они
+    теряются и учитываются в метрике.
+    """
+
+    def __init__(
+        self,
+        index_name: str,
+        service: Optional[ElasticsearchService] = None,
+        max_docs: int = settings.ES_BULK_MAX_DOCS,
+        max_bytes: int = settings.ES_BULK_MAX_BYTES,
+        max_age: float = settings.ES_BULK_MAX_AGE,
+        max_pending_bytes: int = settings.ES_BULK_MAX_PENDING_BYTES,
+        max_retries: int = settings.ES_BULK_MAX_RETRIES,
+        retry_backoff: float = settings.ES_BULK_RETRY_BACKOFF,
+        spill: Optional[SpillStore] = None,
+    ):
+        self.index_name = index_name
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_pending_bytes = max_pending_bytes
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.spill = spill
+        self._service = service
+        self._own_service = False
+        # (doc_id, document, size)
+        self._buffer: list[tuple[str, dict, int]] = []
+        self._buffer_bytes = 0
+        self._pending_bytes = 0
+        self._first_added_at: Optional[float] = None
+        self._condition = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self):
+        if self._service is None:
+            self._service = ElasticsearchService()
+            self._own_service = True
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Отправляет остаток буфера и останавливает фоновую задачу."""
+
+        if self._task is None:
+            return
+        async with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        await self._task
+        self._task = None
+        if self._own_service:
+            await self._service.close()
+            self._service = None
+            self._own_service = False
+
+    async def add(self, doc_id: int | str, document: dict):
+        size = len(json_dumpb(document))
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self._pending_bytes < self.max_pending_bytes or self._stopping
+            )
+            self._append(str(doc_id), document, size)
+
+    async def try_add_many(self, documents: list[tuple[int | str, dict]]) -> int:
+        """
+        Добавляет документы, не дожидаясь места в буфере.
+
+        Документы, не поместившиеся в лимит `max_pending_bytes` (Elasticsearch
+        медленный или недоступен), откладываются в `spill`. Возвращает число
+        документов, поставленных в буфер.
+        """
+
+        rejected = []
+        async with self._condition:
+            for doc_id, document in documents:
+                if self._pending_bytes >= self.max_pending_bytes and not self._stopping:
+                    rejected.append((str(doc_id), document))
+                    continue
+                self._append(str(doc_id), document, len(json_dumpb(document)))
+        if rejected:
+            await self._spill(rejected)
+        return len(documents) - len(rejected)
+
+    async def _spill(self, entries: list[tuple[str, dict]]):
+        if self.spill is not None:
+            try:
+                await self.spill.write(entries)
+                ES_DOCUMENTS_SPILLED.labels(self.index_name).inc(len(entries))
+                return
+            except Exception:
+                logger.exception('Failed to spill documents for %s', self.index_name)
+        ES_DOCUMENTS_DROPPED.labels(self.index_name).inc(len(entries))
+        logger.error('Dropping %s documents for %s', len(entries), self.index_name)
+
+    def _append(self, doc_id: str, document: dict, size: int):
+        if not self._buffer:
+            self._first_added_at = asyncio.get_running_loop().time()
+        self._buffer.append((doc_id, document, size))
+        self._buffer_bytes += size
+        self._pending_bytes += size
+        if self._is_full():
+            self._condition.notify_all()
+
+    def _is_full(self) -> bool:
+        return len(self._buffer) >= self.max_docs or self._buffer_bytes >= self.max_bytes
+
+    def _age(self) -> float:
+        if self._first_added_at is None:
+            return 0
+        return asyncio.get_running_loop().time() - self._first_added_at
+
+    async def _run(self):
+        while True:
+            async with self._condition:
+                while not (self._is_full() or self._stopping):
+                    if self._buffer:
+                        timeout = self.max_age - self._age()
+                        if timeout <= 0:
+                            break
+                    else:
+                        timeout = None
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                batch = self._buffer[:self.max_docs]
+                self._buffer = self._buffer[self.max_docs:]
+                self._buffer_bytes -= sum(size for *_, size in batch)
+                self._first_added_at = (
+                    asyncio.get_running_loop().time() if self._buffer else None
+                )
+                if not batch and self._stopping:
+                    return
+
+            if batch:
+                try:
+                    await self._send(batch)
+                finally:
+                    async with self._condition:
+                        self._pending_bytes -= sum(size for *_, size in batch)
+                        self._condition.notify_all()
+
+    async def _send(self, batch: list[tuple[str, dict, int]]):
+        for attempt in range(self.max_retries + 1):
+            operations = []
+            for doc_id, document, _ in batch:
+                operations.append({'index': {'_index': self.index_name, '_id': doc_id}})
+                operations.append(document)
+            try:
+                response = await self._service.bulk(operations)
+            except Exception:
+                logger.exception('Bulk request to %s failed', self.index_name)
+                retry = batch
+            else:
+                retry = []
+                if response.get('errors'):
+                    for item, entry in zip(response['items'], batch):
+                        result = item.get('index', {})
+                        if result.get('status', 200) < 300:
+                            continue
+                        if result.get('status') in RETRYABLE_STATUSES:
+                            retry.append(entry)
+                        else:
+                            logger.error(
+                                'Document %s rejected by %s: %s',
+                                entry[0], self.index_name, result.get('error'),
+                            )
+            if not retry:
+                return
+            batch = retry
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+        logger.error(
+            'Giving up on %s documents for %s after %s retries',
+            len(batch), self.index_name, self.max_retries,
+        )
+        await self._spill([(doc_id, document) for doc_id, document, _ in batch])
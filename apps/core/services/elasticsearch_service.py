@@ -1,6 +1,7 @@
 from elasticsearch import AsyncElasticsearch
 
 from apps.core.config import settings
+from apps.core.metrics import ES_REQUEST_LATENCY
 
 
 class ElasticsearchService:
@@ -13,11 +14,17 @@ class ElasticsearchService:
         if not await self._es.indices.exists(index=index_name):
             await self._es.indices.create(index=index_name, body=mappings)
 
-    async def search(self, index_name: str, query):
-        return await self._es.search(
-            index=index_name,
-            d={"match_all": query}
-        )
+    async def search(self, index_name: str, query: dict, **kwargs):
+        with ES_REQUEST_LATENCY.labels('search').time():
+            return await self._es.search(index=index_name, query=query, **kwargs)
 
     async def add_document(self, index_name: str, document: dict):
-        await self._es.index(index=index_name, body=document)
\ No newline at end of file
+        with ES_REQUEST_LATENCY.labels('index').time():
+            await self._es.index(index=index_name, body=document)
+
+    async def bulk(self, operations: list[dict]):
+        with ES_REQUEST_LATENCY.labels('bulk').time():
+            return await self._es.bulk(operations=operations)
+
+    async def close(self):
+        await self._es.close()
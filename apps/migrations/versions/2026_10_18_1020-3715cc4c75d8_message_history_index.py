@@ -0,0 +1,42 @@
+"""message_history_index
+
+Revision ID: 3715cc4c75d8
+Revises: 13a73fcddd0a
+Create Date: 2026-10-18 10:20:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3715cc4c75d8'
+down_revision: Union[str, Sequence[str], None] = '13a73fcddd0a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Индекс под keyset-пагинацию истории чата (chat_id, created_at, id).
+    # CONCURRENTLY не блокирует запись в chat_message, но не работает в транзакции.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_chat_message_chat_id_created_at_id',
+            'chat_message',
+            ['chat_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_chat_message_chat_id_created_at_id',
+            table_name='chat_message',
+            postgresql_concurrently=True,
+        )
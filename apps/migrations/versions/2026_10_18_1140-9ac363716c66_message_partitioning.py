@@ -0,0 +1,121 @@
+"""message_partitioning
+
+Revision ID: 9ac363716c66
+Revises: 3715cc4c75d8
+Create Date: 2026-10-18 11:40:12.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9ac363716c66'
+down_revision: Union[str, Sequence[str], None] = '3715cc4c75d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Сколько месяцев вперёд создаются партиции сразу при миграции
+MONTHS_AHEAD = 3
+
+COLUMNS = 'id, content, user_uid, username, email, created_at, modified_at, chat_id'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Переводим chat_message на помесячное RANGE-партиционирование по created_at.
+    # Данные переносятся копированием, на больших таблицах миграцию стоит
+    # выполнять в окно обслуживания.
+    op.execute('ALTER TABLE chat_message RENAME TO chat_message_legacy')
+    op.execute('ALTER INDEX chat_message_pkey RENAME TO chat_message_legacy_pkey')
+    op.execute(
+        'ALTER INDEX ix_chat_message_chat_id_created_at_id '
+        'RENAME TO ix_chat_message_legacy_chat_id_created_at_id'
+    )
+    op.execute(
+        """
+        CREATE TABLE chat_message (
+            id INTEGER NOT NULL DEFAULT nextval('chat_message_id_seq'::regclass),
+            content TEXT NOT NULL,
+            user_uid VARCHAR(36) NOT NULL,
+            username VARCHAR(50) NOT NULL,
+            email VARCHAR(50) NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            modified_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            chat_id INTEGER REFERENCES chat_chat (id) ON DELETE SET NULL,
+            CONSTRAINT chat_message_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute('CREATE TABLE chat_message_default PARTITION OF chat_message DEFAULT')
+    # Партиции за все месяцы с данными и на MONTHS_AHEAD месяцев вперёд (границы в UTC)
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month TIMESTAMP;
+            last_month TIMESTAMP := date_trunc('month', now() AT TIME ZONE 'UTC')
+                + INTERVAL '{MONTHS_AHEAD} months';
+        BEGIN
+            SELECT date_trunc('month', coalesce(min(created_at), now()) AT TIME ZONE 'UTC')
+            INTO month FROM chat_message_legacy;
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF chat_message '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    'chat_message_p' || to_char(month, 'YYYY_MM'),
+                    month::TEXT || '+00',
+                    (month + INTERVAL '1 month')::TEXT || '+00'
+                );
+                month := month + INTERVAL '1 month';
+            END LOOP;
+        END $$
+        """
+    )
+    op.execute(
+        f'INSERT INTO chat_message ({COLUMNS}) SELECT {COLUMNS} FROM chat_message_legacy'
+    )
+    op.execute('ALTER SEQUENCE chat_message_id_seq OWNED BY chat_message.id')
+    op.drop_table('chat_message_legacy')
+    op.create_index(
+        'ix_chat_message_chat_id_created_at_id',
+        'chat_message',
+        ['chat_id', 'created_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('ALTER TABLE chat_message RENAME TO chat_message_partitioned')
+    op.execute('ALTER INDEX chat_message_pkey RENAME TO chat_message_partitioned_pkey')
+    op.execute(
+        'ALTER INDEX ix_chat_message_chat_id_created_at_id '
+        'RENAME TO ix_chat_message_partitioned_chat_id_created_at_id'
+    )
+    op.create_table('chat_message',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('chat_message_id_seq'::regclass)"), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('user_uid', sa.String(length=36), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('email', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('modified_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('chat_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['chat_id'], ['chat_chat.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id', name='chat_message_pkey')
+    )
+    op.execute(
+        f'INSERT INTO chat_message ({COLUMNS}) SELECT {COLUMNS} FROM chat_message_partitioned'
+    )
+    op.execute('ALTER SEQUENCE chat_message_id_seq OWNED BY chat_message.id')
+    # Вместе с родительской таблицей удаляются и все её партиции
+    op.execute('DROP TABLE chat_message_partitioned CASCADE')
+    op.create_index(
+        'ix_chat_message_chat_id_created_at_id',
+        'chat_message',
+        ['chat_id', 'created_at', 'id'],
+        unique=False,
+    )
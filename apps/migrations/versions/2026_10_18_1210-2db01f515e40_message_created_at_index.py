@@ -0,0 +1,36 @@
+"""message_created_at_index
+
+Revision ID: 2db01f515e40
+Revises: 9ac363716c66
+Create Date: 2026-10-18 12:10:37.284519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2db01f515e40'
+down_revision: Union[str, Sequence[str], None] = '9ac363716c66'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Индекс под keyset-обход старых сообщений при архивации.
+    # На партиционированной таблице CONCURRENTLY недоступен, индекс строится
+    # на всех партициях с блокировкой записи.
+    op.create_index(
+        'ix_chat_message_created_at_id',
+        'chat_message',
+        ['created_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_message_created_at_id', table_name='chat_message')
@@ -0,0 +1,9 @@
+import os
+from pathlib import Path
+
+from dotenv import dotenv_values
+
+# Settings требует заполненный .env; без него берём значения из example.env
+for name, value in dotenv_values(Path(__file__).parent.parent / 'example.env').items():
+    if value:
+        os.environ.setdefault(name, value)
@@ -0,0 +1,91 @@
+import asyncio
+
+from apps.chat_service.backplane import (
+    BroadcastBackplane,
+    InMemoryBroker,
+    InMemoryTransport,
+)
+from apps.core.managers.connection_manager import Connection, ConnectionManager
+
+CHAT_ID = 42
+MESSAGE = {'type': 'message', 'chat_id': CHAT_ID, 'content': 'Добрый день'}
+
+
+def register(manager: ConnectionManager, chat_id: int, user_id: str) -> Connection:
+    """Регистрирует соединение без сокета: фреймы остаются в его очереди."""
+
+    connection = Connection(chat_id, user_id, websocket=None, queue_size=10)
+    manager.active_connections.setdefault(chat_id, {}).setdefault(user_id, set()).add(
+        connection
+    )
+    manager.user_connections.setdefault(user_id, set()).add(connection)
+    return connection
+
+
+def frames(connection: Connection) -> list:
+    result = []
+    while not connection.queue.empty():
+        result.append(connection.queue.get_nowait())
+    return result
+
+
+async def start_nodes(broker: InMemoryBroker, count: int):
+    nodes = []
+    for _ in range(count):
+        manager = ConnectionManager()
+        backplane = BroadcastBackplane(manager, topic='chat-broadcast')
+        await backplane.start(InMemoryTransport(broker))
+        nodes.append((manager, backplane))
+    return nodes
+
+
+def test_message_reaches_connections_on_other_node():
+    async def scenario():
+        (manager_a, backplane_a), (manager_b, backplane_b) = await start_nodes(
+            InMemoryBroker(), 2
+        )
+        sender = register(manager_a, CHAT_ID, 'operator')
+        local = register(manager_a, CHAT_ID, 'client-1')
+        remote = register(manager_b, CHAT_ID, 'client-2')
+        other_chat = register(manager_b, CHAT_ID + 1, 'client-3')
+
+        await backplane_a.publish(CHAT_ID, MESSAGE, exclude=sender)
+        await backplane_a.stop()
+        await backplane_b.stop()
+        frame = manager_a.encode(MESSAGE)
+        return frame, frames(sender), frames(local), frames(remote), frames(other_chat)
+
+    frame, sender, local, remote, other_chat = asyncio.run(scenario())
+    assert sender == []
+    # Свой узел получает сообщение один раз: эхо из брокера пропускается
+    assert local == [frame]
+    assert remote == [frame]
+    assert other_chat == []
+
+
+def test_exclude_user_applies_on_every_node():
+    async def scenario():
+        (manager_a, backplane_a), (manager_b, _) = await start_nodes(InMemoryBroker(), 2)
+        register(manager_a, CHAT_ID, 'operator')
+        own_device = register(manager_b, CHAT_ID, 'operator')
+        client = register(manager_b, CHAT_ID, 'client')
+
+        await backplane_a.publish(CHAT_ID, MESSAGE, exclude_user='operator')
+        return frames(own_device), frames(client)
+
+    own_device, client = asyncio.run(scenario())
+    assert own_device == []
+    assert len(client) == 1
+
+
+def test_stopped_node_receives_nothing():
+    async def scenario():
+        (manager_a, backplane_a), (manager_b, backplane_b) = await start_nodes(
+            InMemoryBroker(), 2
+        )
+        remote = register(manager_b, CHAT_ID, 'client')
+        await backplane_b.stop()
+        await backplane_a.publish(CHAT_ID, MESSAGE)
+        return frames(remote)
+
+    assert asyncio.run(scenario()) == []
@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from apps.chat_service.message.services.search_backfill import backfill
+from apps.core.services.elasticsearch_indexer import BulkIndexer, SpillStore
+
+INDEX = 'chat-messages'
+
+
+class FakeService:
+    """Заглушка ElasticsearchService: принимает или отвергает все bulk-запросы."""
+
+    def __init__(self, available: bool = True):
+        self.available = available
+        self.indexed: dict[str, dict] = {}
+
+    async def bulk(self, operations: list[dict]):
+        if not self.available:
+            raise ConnectionError('Elasticsearch is unavailable')
+        for action, document in zip(operations[::2], operations[1::2]):
+            self.indexed[action['index']['_id']] = document
+        return {'errors': False, 'items': []}
+
+
+def make_indexer(service: FakeService, spill: SpillStore, **kwargs) -> BulkIndexer:
+    return BulkIndexer(
+        INDEX,
+        service=service,
+        max_age=0.01,
+        max_retries=1,
+        retry_backoff=0,
+        spill=spill,
+        **kwargs,
+    )
+
+
+def documents(count: int) -> list[tuple[int, dict]]:
+    return [
+        (doc_id, {'id': doc_id, 'content': f'message {doc_id}'}) for doc_id in range(count)
+    ]
+
+
+def test_unsent_documents_are_spilled_and_backfilled(tmp_path):
+    spill = SpillStore(tmp_path, INDEX)
+    later = datetime.now(timezone.utc) + timedelta(minutes=5)
+
+    async def scenario():
+        # Elasticsearch недоступен: после повторов документы уходят на диск
+        down = FakeService(available=False)
+        indexer = make_indexer(down, spill)
+        await indexer.start()
+        assert await indexer.try_add_many(documents(3)) == 3
+        await indexer.stop()
+        assert down.indexed == {}
+
+        up = FakeService()
+        sent = await backfill(make_indexer(up, spill), now=later)
+        return sent, up.indexed
+
+    sent, indexed = asyncio.run(scenario())
+    assert sent == 3
+    assert sorted(indexed) == ['0', '1', '2']
+    assert spill.closed_files(later) == []
+
+
+def test_full_buffer_spills_instead_of_waiting(tmp_path):
+    spill = SpillStore(tmp_path, INDEX)
+
+    async def scenario():
+        indexer = make_indexer(FakeService(), spill, max_pending_bytes=1)
+        # Первый документ занимает весь лимит, остальные откладываются
+        return await indexer.try_add_many(documents(4))
+
+    assert asyncio.run(scenario()) == 1
+    later = datetime.now(timezone.utc) + timedelta(minutes=5)
+    spilled = [
+        doc_id for path in spill.closed_files(later) for doc_id, _ in spill.read(path)
+    ]
+    assert spilled == ['1', '2', '3']
+
+
+def test_current_minute_file_is_not_replayed(tmp_path):
+    spill = SpillStore(tmp_path, INDEX)
+    asyncio.run(spill.write([('1', {'id': 1})]))
+    assert spill.closed_files() == []
@@ -0,0 +1,118 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiokafka import TopicPartition
+from aiokafka.errors import IllegalStateError
+
+from apps.core.kafka import KafkaConsumer
+
+TOPIC = 'default-topic'
+P0 = TopicPartition(TOPIC, 0)
+P1 = TopicPartition(TOPIC, 1)
+
+
+def record(tp: TopicPartition, offset: int):
+    return SimpleNamespace(
+        topic=tp.topic, partition=tp.partition, offset=offset, key=None, value=b'{}'
+    )
+
+
+class FakeConsumer:
+    """Заглушка AIOKafkaConsumer: одна выборка и проверка назначения при коммите."""
+
+    def __init__(self, batches: dict, assigned: set):
+        self._batches = [batches]
+        self.assigned = set(assigned)
+        self.commits = []
+
+    async def getmany(self, timeout_ms, max_records):
+        if self._batches:
+            return self._batches.pop()
+        await asyncio.sleep(0.01)
+        return {}
+
+    def assignment(self):
+        return set(self.assigned)
+
+    def highwater(self, tp):
+        return None
+
+    async def commit(self, offsets):
+        for tp in offsets:
+            if tp not in self.assigned:
+                raise IllegalStateError(f'Partition {tp} is not assigned')
+        self.commits.append(dict(offsets))
+
+
+def make_consumer(handler, commit_interval: float = 1.0) -> KafkaConsumer:
+    consumer = KafkaConsumer(
+        group_id='test', commit_interval=commit_interval, dead_letter_topic=None
+    )
+    consumer.batch_handler = handler
+    consumer.consumer = FakeConsumer(
+        {P0: [record(P0, 0)], P1: [record(P1, offset) for offset in range(5)]},
+        {P0, P1},
+    )
+    return consumer
+
+
+async def revoke(consumer: KafkaConsumer, partitions: set):
+    # Как в aiokafka: назначение меняется только после on_partitions_revoked
+    await consumer.release_partitions(partitions)
+    consumer.consumer.assigned -= partitions
+
+
+async def wait_for_commit(consumer: KafkaConsumer, tp: TopicPartition):
+    while not any(tp in commit for commit in consumer.consumer.commits):
+        await asyncio.sleep(0.01)
+
+
+def test_revoke_waits_for_batch_in_progress():
+    async def scenario():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def handler(values, topic, partition, offsets):
+            if partition == P0.partition:
+                started.set()
+                await release.wait()
+
+        consumer = make_consumer(handler)
+        task = asyncio.create_task(consumer.consume_batches())
+        await started.wait()
+        revoking = asyncio.create_task(revoke(consumer, {P0}))
+        await asyncio.sleep(0.05)
+        assert not revoking.done()
+        release.set()
+        await revoking
+        await asyncio.wait_for(wait_for_commit(consumer, P1), 1)
+        task.cancel()
+        return consumer
+
+    consumer = asyncio.run(scenario())
+    committed = {}
+    for commit in consumer.consumer.commits:
+        committed.update(commit)
+    assert committed == {P0: 1, P1: 5}
+    assert consumer._committable == {P1: 5}
+
+
+def test_revoke_timeout_cancels_batch_and_keeps_committing():
+    async def scenario():
+        started = asyncio.Event()
+
+        async def handler(values, topic, partition, offsets):
+            if partition == P0.partition:
+                started.set()
+                await asyncio.Event().wait()
+
+        consumer = make_consumer(handler, commit_interval=0.01)
+        task = asyncio.create_task(consumer.consume_batches())
+        await started.wait()
+        await revoke(consumer, {P0})
+        await asyncio.wait_for(wait_for_commit(consumer, P1), 1)
+        task.cancel()
+        return consumer
+
+    consumer = asyncio.run(scenario())
+    assert consumer.consumer.commits == [{P1: 5}]
+    assert consumer._committable == {P1: 5}
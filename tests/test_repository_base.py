@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+from apps.chat_service.chat.repository import ChatRepository
+from apps.chat_service.chat.schemas import ChatDetailSchema, ChatUpdateSchema
+
+
+class FailingSession:
+    """Сессия, каждый запрос которой завершается ошибкой драйвера."""
+
+    def __init__(self):
+        self.rolled_back = False
+
+    async def execute(self, stmt):
+        raise DBAPIError('UPDATE ...', {}, Exception('canceling statement due to timeout'))
+
+    async def rollback(self):
+        self.rolled_back = True
+
+
+@pytest.mark.parametrize(
+    'call',
+    [
+        lambda repo: repo.bulk_upsert(
+            [ChatDetailSchema(id=1, name='support')], conflict_columns=['id']
+        ),
+        lambda repo: repo.bulk_update_many([(1, ChatUpdateSchema(name='support'))]),
+    ],
+    ids=['bulk_upsert', 'bulk_update_many'],
+)
+def test_bulk_writes_roll_back_on_database_error(call):
+    session = FailingSession()
+    with pytest.raises(DBAPIError):
+        asyncio.run(call(ChatRepository(session)))
+    assert session.rolled_back